@@ -0,0 +1,93 @@
+# Compression ratio and throughput of BinaryStreamLogger codecs on synthetic EMG.
+# Run from the repository root:  python -m benchmarks.bench_compression
+import os
+import tempfile
+import time
+
+import numpy as np
+from pylsl import StreamInfo
+from scipy.signal import butter, lfilter
+
+from nml.lsl.BinaryStreamLogger import BinaryStreamLogger
+from nml.lsl.StreamLogReader import StreamLogReader
+
+
+def synthetic_emg(n_channels=64, srate=4000, seconds=10.0, lsb_uv=0.0715, seed=0):
+    # Band-limited (20-450 Hz) noise in contraction bursts, plus 50 Hz hum and a noise
+    # floor, quantized to the amplifier LSB the way TMSi float32 samples are.
+    rng = np.random.default_rng(seed)
+    n = int(srate * seconds)
+    t = np.arange(n) / srate
+    b, a = butter(4, [20 / (srate / 2), 450 / (srate / 2)], btype='band')
+    emg = lfilter(b, a, rng.standard_normal((n, n_channels)), axis=0) * 40.0
+    bursts = 0.1 + 0.9 * (np.sin(2 * np.pi * 0.25 * t) > 0.3)
+    hum = 5.0 * np.sin(2 * np.pi * 50 * t + rng.uniform(0, 2 * np.pi, (n_channels, 1))).T
+    x = emg * bursts[:, None] + hum + rng.standard_normal((n, n_channels)) * 2.0
+    x = np.round(x / lsb_uv) * lsb_uv
+    # LSL timestamps: nominal spacing with a little jitter
+    timestamps = 1000.0 + t + rng.normal(0, 2e-6, n)
+    return x.astype(np.float32), timestamps
+
+
+class ArrayInlet:
+    def __init__(self, data, timestamps, srate, chunk_size=200):
+        n_channels = data.shape[1]
+        self._info = StreamInfo('SyntheticEMG', 'EMG', n_channels, srate, 'float32', 'bench-emg')
+        chs = self._info.desc().append_child("channels")
+        for i in range(n_channels):
+            chs.append_child("channel").append_child_value("label", f"UNI{i + 1:02d}")
+        self.data = data
+        self.timestamps = timestamps
+        self.chunk_size = chunk_size
+        self.pos = 0
+
+    def info(self):
+        return self._info
+
+    def pull_chunk(self, timeout=0.0, max_samples=1024, dest_obj=None):
+        n = min(self.chunk_size, max_samples, len(self.timestamps) - self.pos)
+        dest_obj[:n] = self.data[self.pos:self.pos + n]
+        timestamps = self.timestamps[self.pos:self.pos + n].tolist()
+        self.pos += n
+        return None, timestamps
+
+
+def run(path, data, timestamps, srate, **kwargs):
+    inlet = ArrayInlet(data, timestamps, srate)
+    t0 = time.perf_counter()
+    logger = BinaryStreamLogger(inlet, path, **kwargs)
+    while inlet.pos < len(timestamps):
+        logger.log_chunk()
+    logger.log_chunk()  # pending chunk, if the stream was shorter than one pull
+    write_s = time.perf_counter() - t0
+    logger.close()
+    close_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    result = StreamLogReader(path).load()
+    read_s = time.perf_counter() - t0
+    assert np.array_equal(result['data'], data) and np.array_equal(result['timestamps'], timestamps)
+    return os.path.getsize(path), write_s, close_s, read_s
+
+
+def main():
+    srate = 4000
+    data, timestamps = synthetic_emg(srate=srate)
+    raw_mb = (data.nbytes + timestamps.nbytes) / 1e6
+    print(f"Synthetic EMG: {data.shape[1]} ch x {data.shape[0]} samples @ {srate} Hz = {raw_mb:.1f} MB raw")
+    print(f"{'codec':>8} {'level':>6} {'size (MB)':>10} {'ratio':>6} {'log (MB/s)':>11} "
+          f"{'incl. drain (MB/s)':>19} {'load (MB/s)':>12}")
+    configs = [(None, None), ('zlib', 1), ('zlib', 6), ('lzma', 0), ('lzma', 3)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for codec, level in configs:
+            path = os.path.join(tmp, f"{codec}_{level}.bin")
+            size, write_s, close_s, read_s = run(path, data, timestamps, srate,
+                                                 codec=codec, compression_level=level)
+            print(f"{str(codec):>8} {str(level):>6} {size / 1e6:>10.1f} {raw_mb * 1e6 / size:>6.2f} "
+                  f"{raw_mb / write_s:>11.1f} {raw_mb / close_s:>19.1f} {raw_mb / read_s:>12.1f}")
+    print("'log' is what the acquisition side sees; blocks are compressed on the logger's "
+          "background thread and 'incl. drain' waits for it in close().")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# Compare the vectorized version 1 StreamLogReader loader against the previous per-record loop.
+# Run from the repository root:  python -m benchmarks.bench_load [--size-mb 1024]
+import argparse
+import multiprocessing
+import os
+import struct
+import tempfile
+import time
+
+import numpy as np
+
+from nml.lsl.BinaryStreamLogger import BinaryStreamLogger
+from nml.lsl.StreamLogReader import StreamLogReader
+from benchmarks.bench_throughput import SyntheticInlet
+
+
+class LoopStreamLogReader(StreamLogReader):
+    # The pre-vectorization loader, kept here as the baseline
+    def _load_v1(self, f, header):
+        nch = header["n_channels"]
+        dtype = header["dtype"]
+        timestamps = []
+        samples = []
+        sample_size = nch * dtype.itemsize
+        while True:
+            ts_bytes = f.read(8)
+            if not ts_bytes:
+                break
+            if len(ts_bytes) < 8:
+                raise EOFError("Unexpected end of file while reading timestamp.")
+            ts = struct.unpack('<d', ts_bytes)[0]
+            sample_data = f.read(sample_size)
+            if len(sample_data) < sample_size:
+                raise EOFError("Unexpected end of file while reading sample data.")
+            timestamps.append(ts)
+            samples.append(np.frombuffer(sample_data, dtype=dtype))
+        return np.array(timestamps), np.stack(samples)
+
+
+def write_log(path, size_mb, n_channels, srate=4000):
+    n_samples = int(size_mb * 1e6 / (8 + 4 * n_channels))
+    inlet = SyntheticInlet(n_channels, srate, chunk_size=1000, n_samples=n_samples)
+    logger = BinaryStreamLogger(inlet, path, version=1)
+    while inlet.pulled < n_samples or hasattr(logger, 'pending_chunk'):
+        logger.log_chunk()
+    logger.close()
+    return n_samples
+
+
+def timed_load(reader_cls, path, queue):
+    # Runs in a fresh process so peak memory is the loader's own
+    t0 = time.perf_counter()
+    result = reader_cls(path).load()
+    elapsed = time.perf_counter() - t0
+    try:
+        import resource
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    except ImportError:
+        peak_mb = float('nan')
+    digest = (float(result['timestamps'].sum()), float(result['data'].sum(dtype=np.float64)),
+              result['data'].shape)
+    queue.put((elapsed, peak_mb, digest))
+
+
+def run(reader_cls, path):
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(target=timed_load, args=(reader_cls, path, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Version 1 loader benchmark")
+    parser.add_argument('--size-mb', type=float, default=1024)
+    parser.add_argument('--channels', type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'v1.bin')
+        n_samples = write_log(path, args.size_mb, args.channels)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"Version 1 log: {args.channels} ch x {n_samples:,} samples = {size_mb:,.0f} MB")
+        print(f"{'loader':>10} {'time (s)':>9} {'MB/s':>8} {'peak RSS (MB)':>14}")
+        results = {}
+        for name, cls in (('loop', LoopStreamLogReader), ('vectorized', StreamLogReader)):
+            elapsed, peak_mb, digest = run(cls, path)
+            results[name] = digest
+            print(f"{name:>10} {elapsed:>9.2f} {size_mb / elapsed:>8.0f} {peak_mb:>14,.0f}")
+        print(f"identical: {results['loop'] == results['vectorized']}")
+
+
+if __name__ == '__main__':
+    main()
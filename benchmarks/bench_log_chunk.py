@@ -0,0 +1,97 @@
+# Compare BinaryStreamLogger.log_chunk against the previous per-sample write loop.
+# Run from the repository root:  python -m benchmarks.bench_log_chunk
+import os
+import struct
+import tempfile
+import time
+
+import numpy as np
+from pylsl import StreamInfo
+
+from nml.lsl.BinaryStreamLogger import BinaryStreamLogger
+
+
+class FakeInlet:
+    def __init__(self, n_channels=64, srate=4000, chunk_size=200, fmt='float32', as_array=False):
+        self._info = StreamInfo('Bench', 'EMG', n_channels, srate, fmt, 'bench')
+        chs = self._info.desc().append_child("channels")
+        for i in range(n_channels):
+            chs.append_child("channel").append_child_value("label", f"UNI{i + 1:02d}")
+        rng = np.random.default_rng(0)
+        self.chunk = rng.standard_normal((chunk_size, n_channels)).astype(np.float32)
+        if not as_array:
+            self.chunk = self.chunk.tolist()  # what pylsl.pull_chunk returns by default
+        self.t = 0.0
+        self.dt = 1.0 / srate
+
+    def info(self):
+        return self._info
+
+    def pull_chunk(self, timeout=0.0, max_samples=1024, dest_obj=None):
+        n = min(len(self.chunk), max_samples)
+        timestamps = [self.t + i * self.dt for i in range(n)]
+        self.t += n * self.dt
+        if dest_obj is not None:
+            dest_obj[:n] = self.chunk[:n]
+            return None, timestamps
+        return self.chunk[:n], timestamps
+
+
+class LoopStreamLogger(BinaryStreamLogger):
+    # The pre-vectorization implementation, kept here as the baseline
+    def log_chunk(self):
+        if hasattr(self, 'pending_chunk'):
+            chunk, timestamps = self.pending_chunk
+            del self.pending_chunk
+        else:
+            chunk, timestamps = self.inlet.pull_chunk(timeout=0.1)
+        if len(timestamps) == 0:
+            return
+        arr = np.array(chunk, dtype=self.sample_dtype).T
+        for ts, col in zip(timestamps, arr.T):
+            self.outfile.write(struct.pack('<d', ts))
+            self.outfile.write(col.tobytes())
+
+
+def run(logger_cls, path, n_channels, srate, chunk_size, n_chunks, as_array, version=1):
+    # The loop baseline writes bare records, so the comparison is made on version 1 files
+    inlet = FakeInlet(n_channels, srate, chunk_size, as_array=as_array)
+    logger = logger_cls(inlet, path, version=version)
+    logger.log_chunk()  # pending first chunk
+    t0 = time.perf_counter()
+    for _ in range(n_chunks):
+        logger.log_chunk()
+    elapsed = time.perf_counter() - t0
+    logger.close()
+    return n_chunks * chunk_size / elapsed
+
+
+def bench(tmp, n_chunks, as_array):
+    # BinaryStreamLogger always pulls into its preallocated buffer; this only changes the baseline
+    print("\nBaseline pulls NumPy arrays (write path only):" if as_array
+          else "Baseline pulls nested lists (pylsl default):")
+    print(f"{'channels':>8} {'chunk':>6} {'loop (samp/s)':>15} {'vectorized (samp/s)':>20} {'speedup':>8} "
+          f"{'identical':>10} {'v2 blocks (samp/s)':>19}")
+    for n_channels in (8, 64, 256):
+        for chunk_size in (20, 200):
+            old_path = os.path.join(tmp, 'loop.bin')
+            new_path = os.path.join(tmp, 'vec.bin')
+            old_rate = run(LoopStreamLogger, old_path, n_channels, 4000, chunk_size, n_chunks, as_array)
+            new_rate = run(BinaryStreamLogger, new_path, n_channels, 4000, chunk_size, n_chunks, as_array)
+            with open(old_path, 'rb') as a, open(new_path, 'rb') as b:
+                identical = a.read() == b.read()
+            v2_rate = run(BinaryStreamLogger, os.path.join(tmp, 'v2.bin'), n_channels, 4000, chunk_size,
+                          n_chunks, as_array, version=2)
+            print(f"{n_channels:>8} {chunk_size:>6} {old_rate:>15,.0f} {new_rate:>20,.0f} "
+                  f"{new_rate / old_rate:>7.1f}x {str(identical):>10} {v2_rate:>19,.0f}")
+
+
+def main():
+    n_chunks = 200
+    with tempfile.TemporaryDirectory() as tmp:
+        for as_array in (False, True):
+            bench(tmp, n_chunks, as_array)
+
+
+if __name__ == '__main__':
+    main()
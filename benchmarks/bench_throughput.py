@@ -0,0 +1,242 @@
+# Sustainable throughput of BinaryStreamLogger and ParameterLogger.
+# Run from the repository root:
+#   python -m benchmarks.bench_throughput                 # synthetic inlet sweep
+#   python -m benchmarks.bench_throughput --loopback      # real pylsl outlet -> inlet, in real time
+#   python -m benchmarks.bench_throughput --quick --codec zlib
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+from pylsl import StreamInfo, StreamOutlet, StreamInlet, resolve_byprop
+
+from nml.lsl.BinaryStreamLogger import BinaryStreamLogger
+from nml.lsl.ParameterLogger import ParameterLogger
+
+
+class SyntheticInlet:
+    # Stands in for pylsl.StreamInlet: info(), pull_chunk() (incl. dest_obj), pull_sample()
+    def __init__(self, n_channels=64, srate=4000, chunk_size=100, fmt='float32', n_samples=None):
+        self._info = StreamInfo('Bench', 'EMG', n_channels, srate, fmt, 'bench-throughput')
+        chs = self._info.desc().append_child("channels")
+        for i in range(n_channels):
+            chs.append_child("channel").append_child_value("label", f"UNI{i + 1:02d}")
+        rng = np.random.default_rng(0)
+        self.chunk = (rng.standard_normal((chunk_size, n_channels)) * 100).astype(fmt)
+        self.n_samples = n_samples  # None: endless
+        self.pulled = 0
+        self.t = 1000.0
+        self.dt = 1.0 / srate
+
+    def info(self):
+        return self._info
+
+    def time_correction(self, timeout=None):
+        return 0.0
+
+    def _take(self, n):
+        if self.n_samples is not None:
+            n = max(0, min(n, self.n_samples - self.pulled))
+        timestamps = self.t + np.arange(n) * self.dt
+        self.t += n * self.dt
+        self.pulled += n
+        return n, timestamps.tolist()
+
+    def pull_chunk(self, timeout=0.0, max_samples=1024, dest_obj=None):
+        n, timestamps = self._take(min(len(self.chunk), max_samples))
+        if dest_obj is not None:
+            dest_obj[:n] = self.chunk[:n]
+            return None, timestamps
+        return self.chunk[:n].tolist(), timestamps
+
+    def pull_sample(self, timeout=0.0):
+        n, timestamps = self._take(1)
+        if n == 0:
+            return None, None
+        return self.chunk[0].tolist(), timestamps[0]
+
+
+class MarkerInlet:
+    # JSON parameter messages the way the MATLAB side sends them to ParameterLogger
+    def __init__(self, n_messages, params_per_trial=8):
+        self._info = StreamInfo('BenchMarkers', 'Markers', 1, 0, 'string', 'bench-markers')
+        self.messages = []
+        trial = 0
+        while len(self.messages) < n_messages:
+            self.messages.append({'name': 'filename', 'value': f"trial_{trial:04d}"})
+            self.messages.append({'name': 'state', 'value': 'rec'})
+            for k in range(params_per_trial):
+                self.messages.append({'name': 'parameter', 'value': {'amplitude': k, 'width': 200}})
+            self.messages.append({'name': 'state', 'value': 'idle'})
+            trial += 1
+        self.messages = [json.dumps(dict(m, loop_ts=i * 1e-3)) for i, m in enumerate(self.messages[:n_messages])]
+        self.pos = 0
+        self.pull_times = []
+        self.done = threading.Event()
+
+    def info(self):
+        return self._info
+
+    def pull_sample(self, timeout=0.0):
+        self.pull_times.append(time.perf_counter())
+        if self.pos >= len(self.messages):
+            self.done.set()
+            time.sleep(min(timeout, 0.01))
+            return None, None
+        self.pos += 1
+        return [self.messages[self.pos - 1]], 1000.0 + self.pos * 1e-3
+
+
+def percentiles(latencies):
+    if len(latencies) == 0:
+        return np.zeros(3)
+    return np.percentile(np.asarray(latencies) * 1e6, [50, 99, 100])  # us
+
+
+def run_binary(path, n_channels, srate, chunk_size, seconds, **kwargs):
+    # Drive log_chunk() as fast as the synthetic inlet allows and time every call
+    n_total = int(srate * seconds)
+    inlet = SyntheticInlet(n_channels, srate, chunk_size, n_samples=n_total)
+    logger = BinaryStreamLogger(inlet, path, **kwargs)
+    latencies = []
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    while inlet.pulled < n_total or hasattr(logger, 'pending_chunk'):
+        start = time.perf_counter()
+        logger.log_chunk()
+        latencies.append(time.perf_counter() - start)
+    logger.close()
+    elapsed, cpu = time.perf_counter() - t0, time.process_time() - cpu0
+    return {
+        "samples_per_s": n_total / elapsed,
+        "cpu_us_per_sample": cpu / n_total * 1e6,
+        "latency_us": percentiles(latencies),
+        "bytes_per_sample": os.path.getsize(path) / n_total,
+    }
+
+
+def run_loopback(path, n_channels, srate, chunk_size, seconds, **kwargs):
+    # Real outlet pushing in real time on a thread; the logger pulls through an actual inlet
+    info = StreamInfo('BenchLoopback', 'EMG', n_channels, srate, 'float32', f'bench-loop-{os.getpid()}')
+    outlet = StreamOutlet(info, chunk_size)
+    chunk = (np.random.default_rng(0).standard_normal((chunk_size, n_channels)) * 100).astype(np.float32)
+    n_total = int(srate * seconds)
+    pushed = [0]
+    stop = threading.Event()
+
+    def push():
+        t_next = time.perf_counter()
+        while pushed[0] < n_total and not stop.is_set():
+            outlet.push_chunk(chunk)
+            pushed[0] += chunk_size
+            t_next += chunk_size / srate
+            time.sleep(max(0.0, t_next - time.perf_counter()))
+
+    streams = resolve_byprop('source_id', info.source_id(), timeout=5.0)
+    inlet = StreamInlet(streams[0])
+    inlet.open_stream(timeout=5.0)
+    pusher = threading.Thread(target=push, daemon=True)
+    pusher.start()
+    logger = BinaryStreamLogger(inlet, path, **kwargs)
+    written = len(logger.pending_chunk[1])
+    latencies = []
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    logger.log_chunk()
+    while pusher.is_alive() or written < pushed[0]:
+        data, timestamps = logger.chunk_buffer.pull(timeout=0.1)
+        start = time.perf_counter()  # write path only; the pull mostly waits for the outlet
+        logger.write_chunk(data, timestamps)
+        latencies.append(time.perf_counter() - start)
+        written += len(timestamps)
+        if not pusher.is_alive() and len(timestamps) == 0:
+            break
+    stop.set()
+    logger.close()
+    elapsed, cpu = time.perf_counter() - t0, time.process_time() - cpu0
+    return {
+        "samples_per_s": written / elapsed,
+        "cpu_us_per_sample": cpu / max(written, 1) * 1e6,
+        "latency_us": percentiles(latencies),
+        "bytes_per_sample": os.path.getsize(path) / max(written, 1),
+        "received": written / max(pushed[0], 1),
+    }
+
+
+def run_parameter_logger(log_dir, n_messages):
+    inlet = MarkerInlet(n_messages)
+    logger = ParameterLogger(log_dir=log_dir, inlet=inlet)
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    logger.start()
+    inlet.done.wait()
+    elapsed, cpu = time.perf_counter() - t0, time.process_time() - cpu0
+    logger.stop()
+    size = sum(os.path.getsize(os.path.join(log_dir, f)) for f in os.listdir(log_dir))
+    # Time between consecutive pulls of real messages = time spent handling one message
+    latencies = np.diff(inlet.pull_times[:n_messages + 1])
+    return {
+        "samples_per_s": n_messages / elapsed,
+        "cpu_us_per_sample": cpu / n_messages * 1e6,
+        "latency_us": percentiles(latencies),
+        "bytes_per_sample": size / n_messages,
+    }
+
+
+def print_row(n_channels, srate, chunk_size, r):
+    p50, p99, pmax = r["latency_us"]
+    headroom = r["samples_per_s"] / srate
+    line = (f"{n_channels:>8} {srate:>7} {chunk_size:>6} {r['samples_per_s']:>14,.0f} {headroom:>9.1f}x "
+            f"{r['cpu_us_per_sample']:>10.2f} {p50:>9.0f} {p99:>9.0f} {pmax:>9.0f} {r['bytes_per_sample']:>9.1f}")
+    if "received" in r:
+        line += f" {r['received'] * 100:>8.1f}%"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logger throughput benchmark")
+    parser.add_argument('--channels', type=int, nargs='+', default=[8, 32, 64, 128, 256])
+    parser.add_argument('--rates', type=int, nargs='+', default=[500, 2000, 4000, 10000])
+    parser.add_argument('--chunks', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--seconds', type=float, default=None,
+                        help="stream seconds per run (default 10 synthetic, 3 loopback)")
+    parser.add_argument('--codec', default=None, choices=['zlib', 'lzma'])
+    parser.add_argument('--version', type=int, default=2, choices=[1, 2])
+    parser.add_argument('--loopback', action='store_true', help="use a local pylsl outlet in real time")
+    parser.add_argument('--quick', action='store_true', help="small sweep for a fast regression check")
+    parser.add_argument('--messages', type=int, default=2000, help="ParameterLogger messages")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.channels, args.rates, args.chunks, args.messages = [8, 64, 256], [500, 4000], [100], 500
+    seconds = args.seconds or (3.0 if args.loopback else 10.0)
+    kwargs = dict(version=args.version, codec=args.codec)
+    runner = run_loopback if args.loopback else run_binary
+
+    print(f"BinaryStreamLogger ({'loopback outlet, real time' if args.loopback else 'synthetic inlet'}, "
+          f"v{args.version}, codec={args.codec}, {seconds:g} s of stream per run)")
+    header = (f"{'channels':>8} {'srate':>7} {'chunk':>6} {'samples/s':>14} {'headroom':>10} "
+              f"{'cpu us/smp':>10} {'p50 us':>9} {'p99 us':>9} {'max us':>9} {'B/sample':>9}")
+    print(header + (f" {'received':>9}" if args.loopback else ""))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.bin')
+        for n_channels in args.channels:
+            for srate in args.rates:
+                for chunk_size in args.chunks:
+                    print_row(n_channels, srate, chunk_size,
+                              runner(path, n_channels, srate, chunk_size, seconds, **kwargs))
+
+    print(f"\nParameterLogger ({args.messages} JSON messages, one CSV append per message)")
+    print(f"{'messages/s':>14} {'cpu us/msg':>10} {'p50 us':>9} {'p99 us':>9} {'max us':>9} {'B/msg':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        r = run_parameter_logger(tmp, args.messages)
+        p50, p99, pmax = r["latency_us"]
+        print(f"{r['samples_per_s']:>14,.0f} {r['cpu_us_per_sample']:>10.1f} {p50:>9.0f} {p99:>9.0f} "
+              f"{pmax:>9.0f} {r['bytes_per_sample']:>9.1f}")
+    print("'headroom' is throughput over the stream's own rate; below 1x the logger cannot keep up. "
+          "Latency is per log_chunk() call (write_chunk() in loopback mode, where headroom is "
+          "capped at ~1x by real time and 'received' shows dropped samples; per message for ParameterLogger).")
+
+
+if __name__ == '__main__':
+    main()
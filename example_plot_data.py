@@ -26,18 +26,9 @@ plt.legend()
 plt.tight_layout()
 plt.show()
 
-uni_indices = [i for i, name in enumerate(ch_names) if "UNI" in name]
-signal_uni = d.signal[uni_indices, :]  # shape: [UNI_channels, samples]
-
-starts = d.get_events('trials')[lambda df: df['Event'] == 'Recording Start']['Timestamp'].values
-ends = d.get_events('trials')[lambda df: df['Event'] == 'Recording End']['Timestamp'].values
-
-segments = []
-
-for start, end in zip(starts, ends):
-    mask = (d.timestamps >= start) & (d.timestamps <= end)
-    trial = signal_uni[:, mask]
-    segments.append(trial)
+# One epoch per trial, from each "Recording Start" to the "Recording End" after it
+epochs = d.epochs('Recording Start', end_event='Recording End', channels='UNI*', ragged=True)
+segments = epochs['segments']  # [n_UNI_channels, samples] array per trial
 
 print("Segments for each trial:")
 print(segments) # segments now contains the signal segments for monopolar textile arrays, for each trial
@@ -45,4 +36,4 @@ print(segments) # segments now contains the signal segments for monopolar textil
 # RMS per trial across UNI channels
 print("RMS per trial across UNI channels:")
 rms_uni_by_trial = [np.sqrt(np.mean(trial**2, axis=1)) for trial in segments]  # list of [n_UNI_channels] arrays
-print(rms_uni_by_trial)
\ No newline at end of file
+print(rms_uni_by_trial)
@@ -0,0 +1,50 @@
+# export_logs.py
+import os
+import argparse
+from nml.lsl.LogExporter import LogExporter
+from nml.lsl.LogFormat import SESSION_SUFFIX
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export stream logs to HDF5, NPZ or CSV.")
+    parser.add_argument('inputs', nargs='+', help=".bin files, .session.json manifests or folders of them")
+    parser.add_argument('--format', choices=LogExporter.FORMATS, default='npz',
+                        help="hdf5 needs h5py (pip install h5py)")
+    parser.add_argument('--out-dir', default=r'logs\export')
+    parser.add_argument('--metadata-folder', default=r'logs\metadata')
+    parser.add_argument('--metadata-key', default=None,
+                        help="metadata session to include, e.g. 20250526_163724_DEFAULT")
+    parser.add_argument('--workers', type=int, default=None, help="parallel export processes")
+    parser.add_argument('--compression', default=None, help="HDF5 dataset compression, e.g. gzip")
+    args = parser.parse_args()
+    if args.format == 'hdf5':
+        try:
+            import h5py  # noqa: F401
+        except ImportError:
+            parser.error("--format hdf5 needs h5py (pip install h5py); npz and csv need nothing extra")
+
+    logs = []
+    for path in args.inputs:
+        logs += LogExporter.find_logs(path) if os.path.isdir(path) else [path]
+    metadata_csvs = {}
+    if args.metadata_key:
+        metadata_csvs = LogExporter.metadata_csvs(args.metadata_folder, args.metadata_key)
+        if not metadata_csvs:
+            print(f"[WARNING] No metadata CSVs for {args.metadata_key} in {args.metadata_folder}")
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    ext = LogExporter.EXTENSIONS[args.format]
+    jobs = []
+    for log in logs:
+        name = os.path.basename(log).replace(SESSION_SUFFIX, '').replace('.bin', '')
+        jobs.append((log, os.path.join(args.out_dir, name + ext), args.format, metadata_csvs))
+
+    exporter = LogExporter(compression=args.compression)
+    results = exporter.export_many(jobs, workers=args.workers)
+    failed = [path for path, error in results.items() if error]
+    print(f"{len(results) - len(failed)} of {len(results)} exported to {args.out_dir}")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+# extract_features.py
+import argparse
+from nml.lsl.FeatureEngine import FeatureEngine, FEATURES
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-trial, per-channel EMG features over many sessions.")
+    parser.add_argument('out', help="result table, .csv or .parquet")
+    parser.add_argument('--stream-folder', default=r'logs\streams')
+    parser.add_argument('--metadata-folder', default=r'logs\metadata')
+    parser.add_argument('--sessions', nargs='*', default=None,
+                        help="STREAM_KEY:METADATA_KEY pairs; default: every log with an overlapping trials CSV")
+    parser.add_argument('--suffix', default=None, help="only metadata sessions with this suffix, e.g. DEFAULT")
+    parser.add_argument('--channels', nargs='*', default=None, help="channel labels, regexes or globs, e.g. 'UNI*'")
+    parser.add_argument('--features', nargs='*', default=list(FEATURES), choices=list(FEATURES))
+    parser.add_argument('--event', default='Recording Start')
+    parser.add_argument('--end-event', default=None, help="default: 'Recording End', unless --tmax is given")
+    parser.add_argument('--tmin', type=float, default=None, help="seconds relative to the event")
+    parser.add_argument('--tmax', type=float, default=None, help="seconds relative to the event (or end event)")
+    parser.add_argument('--workers', type=int, default=None, help="parallel worker processes")
+    parser.add_argument('--fresh', action='store_true', help="ignore the results of an interrupted run")
+    args = parser.parse_args()
+
+    engine = FeatureEngine(args.stream_folder, args.metadata_folder, channels=args.channels,
+                           features=args.features, event=args.event,
+                           end_event=args.end_event or (None if args.tmax is not None else 'Recording End'),
+                           tmin=args.tmin, tmax=args.tmax)
+    if args.sessions:
+        sessions = [tuple(pair.split(':', 1)) for pair in args.sessions]
+    else:
+        sessions = engine.find_sessions(args.suffix)
+    if not sessions:
+        print(f"[WARNING] No sessions with trials found in {args.stream_folder} / {args.metadata_folder}")
+        raise SystemExit(1)
+    table = engine.run(sessions, args.out, workers=args.workers, fresh=args.fresh)
+    raise SystemExit(0 if table is not None else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,10 +3,29 @@ from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QTreeWidget, QTreeWidgetItem,
     QLabel, QFileDialog, QPushButton, QSplitter, QListWidget, QListWidgetItem
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal
 import pyqtgraph as pg
+import numpy as np
 import pandas as pd
 from nml.lsl.StreamLogReader import StreamLogReader
+from nml.lsl.LogPyramid import LogPyramid
+from nml.lsl.SessionCatalog import SessionCatalog
+
+class PyramidBuilder(QThread):
+    built = pyqtSignal(object, object)  # log path, LogPyramid (None if the build failed)
+
+    def __init__(self, log_path):
+        super().__init__()
+        self.log_path = log_path
+
+    def run(self):
+        try:
+            pyramid = LogPyramid.build(self.log_path)
+        except Exception as e:
+            print(f"[ERROR] Failed to build the overview of {self.log_path}: {e}")
+            pyramid = None
+        self.built.emit(self.log_path, pyramid)
+
 
 class LogViewer(QWidget):
     def __init__(self, root_folder=r'logs\streams'):
@@ -17,6 +36,7 @@ class LogViewer(QWidget):
         self.signal_curve = None  # To track the main signal plot
 
         self.metadata_folder = r'logs\metadata'
+        self.catalog = SessionCatalog()
         self.metadata_list = QListWidget()
         self.metadata_list.itemClicked.connect(self.load_metadata_session)
         self.select_metadata_btn = QPushButton("Select Metadata Folder")
@@ -35,6 +55,21 @@ class LogViewer(QWidget):
         self.refresh_btn = QPushButton("Refresh Log List")
         self.refresh_btn.clicked.connect(self.refresh_log_tree)
 
+        # Live view of a recording that is still being written
+        self.follow_btn = QPushButton("Follow Live")
+        self.follow_btn.setCheckable(True)
+        self.follow_btn.toggled.connect(self.toggle_follow)
+        self.follow_timer = QTimer()
+        self.follow_timer.timeout.connect(self.update_follow)
+        self.follow_seconds = 30.0
+        self.follower = None
+        self.plotted = None  # (filepath, channel index) of the current plot
+        self.current_handle = None
+        self.pyramid = None
+        self.builders = {}  # log path -> PyramidBuilder still running
+        self.raw_preview_seconds = 60.0  # longest span drawn from raw samples while there is no pyramid
+        self.plot_widget.getViewBox().sigXRangeChanged.connect(self.on_x_range_changed)
+
         left_layout = QVBoxLayout()
         left_layout.insertWidget(0, self.select_stream_btn)                    
         left_layout.insertWidget(1, self.select_metadata_btn)
@@ -43,6 +78,7 @@ class LogViewer(QWidget):
         left_layout.insertWidget(4, QLabel("Available Recordings"))
         left_layout.insertWidget(5, self.tree)
         left_layout.insertWidget(6, self.refresh_btn)
+        left_layout.insertWidget(7, self.follow_btn)
 
         left_panel = QWidget()
         left_panel.setLayout(left_layout)
@@ -109,22 +145,11 @@ class LogViewer(QWidget):
         if not os.path.exists(self.metadata_folder):
             return
 
-        seen_sessions = set()
-        for filename in os.listdir(self.metadata_folder):
-            if not filename.startswith("logger_") or not filename.endswith(".csv"):
-                continue
-            try:
-                # Parse: logger_YYYYMMDD_HHMMSS_SUFFIX_type.csv
-                parts = filename.replace(".csv", "").split("_")
-                timestamp = parts[1] + "_" + parts[2]
-                suffix = "_".join(parts[3:-1])  # everything up to last part
-                session_key = f"{timestamp}_{suffix}"
-            except Exception:
-                continue
-
-            if session_key in seen_sessions:
-                continue
-            seen_sessions.add(session_key)
+        # Parsed file names come from the catalog; only new or changed CSVs are looked at
+        self.catalog.refresh_metadata(self.metadata_folder)
+        for session in self.catalog.metadata_sessions(self.metadata_folder):
+            timestamp, suffix = session["key"], session["suffix"]
+            session_key = f"{timestamp}_{suffix}"
 
             # Human-readable timestamp
             try:
@@ -159,12 +184,42 @@ class LogViewer(QWidget):
         self.tree.clear()
         if not os.path.exists(self.root_folder):
             return
-        for file in os.listdir(self.root_folder):
-            if file.endswith(".bin"):
-                item = QTreeWidgetItem([file])
-                item.setData(0, Qt.UserRole, os.path.join(self.root_folder, file))
-                item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
-                self.tree.addTopLevelItem(item)
+
+        # Headers are read only for logs that are new or changed since the last refresh.
+        # Rotated recordings show up once, as their session manifest.
+        self.catalog.refresh_streams(self.root_folder)
+        for row in sorted(self.catalog.streams(self.root_folder), key=lambda r: r["name"]):
+            item = QTreeWidgetItem([row["name"]])
+            item.setData(0, Qt.UserRole, row["path"])
+            item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+            if row["error"] is not None:
+                item.setToolTip(0, f"Unreadable header: {row['error']}")
+            else:
+                item.setToolTip(0, self.describe_stream(row))
+            self.tree.addTopLevelItem(item)
+
+    def describe_header(self, header):
+        text = (f"{header['stream_name']}: {header['n_channels']} ch {header['format']} "
+                f"@ {header['sampling_rate']:g} Hz")
+        if header["duration"] is not None:
+            approx = "" if header["n_samples_exact"] else "~"
+            text += f"\n{approx}{header['n_samples']:,} samples ({approx}{header['duration'] / 60:.1f} min)"
+        return text
+
+    def describe_stream(self, row):
+        # Catalog rows carry the header fields; their sample counts are exact
+        return self.describe_header(dict(row, n_samples_exact=True))
+
+    def closeEvent(self, event):
+        self.stop_follow()
+        if self.pyramid is not None:
+            self.pyramid.close()
+        if self.current_handle is not None:
+            self.current_handle.close()
+        for builder in list(self.builders.values()):
+            builder.wait()
+        self.catalog.close()
+        super().closeEvent(event)
 
     def populate_channels(self, item):
         print("Populating channels for:", item.text(0))
@@ -174,40 +229,156 @@ class LogViewer(QWidget):
         self.current_expanded = item
 
         filepath = item.data(0, Qt.UserRole)
-        reader = StreamLogReader(filepath)
         try:
-            result = reader.load()
+            header = StreamLogReader(filepath).read_header()
         except Exception as e:
             print(f"Failed to load: {e}")
             return
 
-        timestamps = result["timestamps"]
-        data = result["data"]
-        metadata = result.get("metadata", {})
-        self.stream_start_time = metadata.get("start_time", timestamps[0])  # store absolute offset
+        # store absolute offset
+        self.stream_start_time = header["start_time"]
 
-        ch_names = metadata.get("channel_names", [f"Channel {i}" for i in range(data.shape[1])])
         item.takeChildren()
 
-        for ch_index, ch_label in enumerate(ch_names):
+        # Only the header is read here; a channel's samples are read when it is plotted
+        for ch_index, ch_label in enumerate(header["channel_names"]):
             ch_item = QTreeWidgetItem([ch_label])
-            ch_item.setData(0, Qt.UserRole, (timestamps, data[:, ch_index]))
+            ch_item.setData(0, Qt.UserRole, (filepath, ch_index))
             item.addChild(ch_item)
 
     def plot_channel(self, item, column):
         data = item.data(0, Qt.UserRole)
         if isinstance(data, tuple):
-            t, y = data
+            filepath, ch_index = data
+            self.plotted = (filepath, ch_index)
+            if self.follow_btn.isChecked():
+                self.start_follow()
+                return
+            try:
+                handle = self.open_log(filepath)
+            except Exception as e:
+                print(f"Failed to load: {e}")
+                return
+            if len(handle) == 0:
+                return
+            t0, t1 = handle.timestamps_for(np.array([0, len(handle) - 1]))
+            if self.open_pyramid(filepath) is None:
+                # Raw samples from the start until the overview has been built
+                t1 = min(t1, t0 + self.raw_preview_seconds)
             self.plot_widget.clear()
             self.marker_items = []
 
             # Plot using true LSL time
-            self.signal_curve = self.plot_widget.plot(t, y, pen='y')
+            self.signal_curve = self.plot_widget.plot([], [], pen='y')
+            self.update_plot_level(t0, t1)
 
             for marker in getattr(self, "current_markers", []):
                 self.plot_widget.addItem(marker['line'])
                 self.plot_widget.addItem(marker['label'])
                 self.marker_items.append(marker['line'])
                 self.marker_items.append(marker['label'])
-            self.plot_widget.setXRange(t[0], t[-1], padding=0.02)
-
+            self.plot_widget.setXRange(t0, t1, padding=0.02)
+
+    def open_log(self, filepath):
+        # Keep one lazy handle open, for the recording being plotted
+        if self.current_handle is not None:
+            if self.current_handle.reader.path == filepath:
+                return self.current_handle
+            self.current_handle.close()
+        self.current_handle = StreamLogReader(filepath).open()
+        return self.current_handle
+
+    def open_pyramid(self, filepath):
+        # Min/max pyramid of the plotted recording from its sidecar. Without a current sidecar,
+        # it is built in a background thread and None is returned until on_pyramid_built.
+        if self.pyramid is not None:
+            if self.pyramid.log_path == filepath:
+                return self.pyramid
+            self.pyramid.close()
+        self.pyramid = LogPyramid.open(filepath, build=False)
+        if self.pyramid is None and filepath not in self.builders:
+            builder = PyramidBuilder(filepath)
+            builder.built.connect(self.on_pyramid_built)
+            self.builders[filepath] = builder
+            builder.start()
+        return self.pyramid
+
+    def on_pyramid_built(self, filepath, pyramid):
+        self.builders.pop(filepath).wait()
+        if pyramid is None:
+            return
+        if self.plotted is None or self.plotted[0] != filepath or self.pyramid is not None:
+            pyramid.close()
+            return
+        self.pyramid = pyramid
+        if not self.follow_btn.isChecked():
+            handle = self.current_handle
+            t0, t1 = handle.timestamps_for(np.array([0, len(handle) - 1]))
+            self.update_plot_level(t0, t1)
+            self.plot_widget.setXRange(t0, t1, padding=0.02)
+
+    def on_x_range_changed(self, _, x_range):
+        if self.current_handle is not None and self.signal_curve is not None and not self.follow_btn.isChecked():
+            self.update_plot_level(*x_range)
+
+    def update_plot_level(self, t0, t1):
+        # Draw about one min/max pair per pixel of the visible span, whatever its length
+        ch_index = self.plotted[1]
+        if self.pyramid is None:
+            # No overview yet (or it could not be built): raw samples, at most raw_preview_seconds
+            rows = self.current_handle.time_slice(t0, min(t1, t0 + self.raw_preview_seconds))
+            self.signal_curve.setData(self.current_handle.timestamps_for(rows), self.current_handle[rows, ch_index])
+            return
+        q = self.pyramid.query(t0, t1, max(self.plot_widget.width(), 100), ch_index)
+        if q["level"] is None:
+            self.signal_curve.setData(q["t"], q["min"])
+        else:
+            # Each bin becomes a vertical stroke from its min to its max
+            t = np.repeat(q["t"], 2)
+            y = np.column_stack((q["min"], q["max"])).ravel()
+            self.signal_curve.setData(t, y)
+
+    def toggle_follow(self, checked):
+        if checked and self.plotted is not None:
+            self.start_follow()
+        elif not checked:
+            self.stop_follow()
+
+    def start_follow(self):
+        self.stop_follow()
+        filepath, _ = self.plotted
+        # Start from the last follow_seconds, not from the beginning of a long recording
+        self.follower = StreamLogReader(filepath).follow(seconds=self.follow_seconds)
+        self.live_t = np.empty(0)
+        self.live_y = np.empty(0)
+        self.plot_widget.clear()
+        self.marker_items = []
+        self.signal_curve = self.plot_widget.plot([], [], pen='y')
+        self.update_follow()
+        self.follow_timer.start(500)
+
+    def stop_follow(self):
+        self.follow_timer.stop()
+        if self.follower is not None:
+            self.follower.close()
+            self.follower = None
+
+    def update_follow(self):
+        # Append only what the logger wrote since the last poll, keeping the last follow_seconds.
+        # Blocks still being written and segments not yet listed are picked up by a later poll.
+        try:
+            t, x = self.follower.poll()
+        except (OSError, ValueError) as e:
+            # e.g. the file was moved or replaced while following it
+            print(f"[ERROR] Stopped following {self.plotted[0]}: {e}")
+            self.follow_timer.stop()
+            return
+        if len(t):
+            self.live_t = np.concatenate((self.live_t, t))
+            self.live_y = np.concatenate((self.live_y, x[:, self.plotted[1]]))
+            keep = np.searchsorted(self.live_t, self.live_t[-1] - self.follow_seconds)
+            self.live_t = self.live_t[keep:]
+            self.live_y = self.live_y[keep:]
+            self.signal_curve.setData(self.live_t, self.live_y)
+        if self.follower.finished:
+            self.follow_timer.stop()
@@ -63,13 +63,13 @@ class SampleCountPlotter(QObject):
         if auto_start:
             self.worker.start()
 
-    @pyqtSlot(list, list)
+    @pyqtSlot(object, object)
     def handle_new_data(self, chunk, timestamps):
-        if not chunk or not timestamps:
+        if len(timestamps) == 0:
             return
 
-        samples = np.array([s[-1] for s in chunk], dtype=np.float64)
-        t = np.array(timestamps)
+        samples = chunk[:, -1].astype(np.float64)
+        t = timestamps
 
         self.timestamps.extend(t.tolist())
         self.amplitudes.extend(samples.tolist())
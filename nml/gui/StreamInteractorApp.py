@@ -10,6 +10,7 @@ from PyQt5.QtCore import Qt, QTimer
 from pylsl import resolve_streams, StreamInlet
 
 from nml.lsl.BinaryStreamLogger import BinaryStreamLogger
+from nml.lsl.StreamRecorder import StreamRecorder, recorder_status
 from nml.plot.TimeSeriesPlot import TimeSeriesPlot
 from nml.plot.TimeSeriesArray import TimeSeriesArray
 from nml.plot.EnvelopeGridImage import EnvelopeGridImage
@@ -24,7 +25,7 @@ class StreamInteractorApp(QWidget):
         # --- State
         self.available = []
         self.connected_loggers = []
-        self.active_loggers = []
+        self.active_recorders = []
         self.plot_widgets = []
 
         # --- Top: Stream Selection
@@ -83,9 +84,9 @@ class StreamInteractorApp(QWidget):
         self.layout.addWidget(QLabel("Interactive Plots"))
         self.layout.addWidget(self.scroll_area)
 
-        # --- Poll Timer
+        # --- Recorder Status Timer
         self.timer = QTimer()
-        self.timer.timeout.connect(self.poll_all)
+        self.timer.timeout.connect(self.update_status)
 
         # --- Initial Stream Load
         self.refresh_streams()
@@ -136,7 +137,7 @@ class StreamInteractorApp(QWidget):
         self.disconnect_btn.setEnabled(True)
 
     def disconnect_streams(self):
-        if self.active_loggers:
+        if self.active_recorders:
             self.status.setText("Stop logging before disconnecting.")
             return
 
@@ -156,31 +157,33 @@ class StreamInteractorApp(QWidget):
             self.status.setText("Must connect to streams before logging.")
             return
 
-        if self.active_loggers:
+        if self.active_recorders:
             self.timer.stop()
-            for logger in self.active_loggers:
-                logger.close()
-            self.active_loggers = []
+            for recorder in self.active_recorders:
+                recorder.stop()
+            overflows = sum(r.ring.overflows for r in self.active_recorders)
+            self.active_recorders = []
             self.toggle_btn.setText("Start Logging")
-            self.status.setText("Logging stopped.")
+            self.status.setText(f"Logging stopped. (queue overflows: {overflows})")
             self.disconnect_btn.setEnabled(True)
         else:
             os.makedirs(self.log_dir, exist_ok=True)
-            self.active_loggers = []
+            self.active_recorders = []
             for logger in self.connected_loggers:
                 stream = logger.inlet.info()
                 fname = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{stream.name()}.bin"
                 path = os.path.join(self.log_dir, fname)
-                new_logger = BinaryStreamLogger(logger.inlet, path)
-                self.active_loggers.append(new_logger)
-            self.timer.start(50)
+                # Recorder threads get their own inlet so they never contend with the plots
+                recorder = StreamRecorder(BinaryStreamLogger(StreamInlet(stream), path))
+                recorder.start()
+                self.active_recorders.append(recorder)
+            self.timer.start(1000)
             self.toggle_btn.setText("Stop Logging")
-            self.status.setText(f"Logging {len(self.active_loggers)} stream(s)...")
+            self.update_status()
             self.disconnect_btn.setEnabled(False)
 
-    def poll_all(self):
-        for logger in self.active_loggers:
-            logger.log_chunk()
+    def update_status(self):
+        self.status.setText(recorder_status(self.active_recorders))
 
     # ---------------------- Plot Management ----------------------
 
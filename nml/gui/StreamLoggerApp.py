@@ -3,13 +3,15 @@ from datetime import datetime
 
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QPushButton, QListWidget,
-    QListWidgetItem, QFileDialog
+    QListWidgetItem, QFileDialog, QCheckBox
 )
 from PyQt5.QtCore import Qt, QTimer
 
 from pylsl import resolve_streams, StreamInlet
 
 from nml.lsl.BinaryStreamLogger import BinaryStreamLogger
+from nml.lsl.StreamRecorder import StreamRecorder, recorder_status
+from nml.lsl.ProcessRecorder import ProcessRecorder
 
 
 class StreamLoggerApp(QWidget):
@@ -22,19 +24,21 @@ class StreamLoggerApp(QWidget):
         self.refresh_btn = QPushButton("Refresh Streams")
         self.dir_btn = QPushButton("Select Log Folder")
         self.toggle_btn = QPushButton("Start Logging")
+        self.process_check = QCheckBox("Record each stream in its own process")
         self.status = QLabel("Idle")
         self.status.setAlignment(Qt.AlignCenter)
 
         self.log_dir = r'logs\streams'
-        self.active_loggers = []
+        self.active_recorders = []
         self.timer = QTimer()
-        self.timer.timeout.connect(self.poll_all)
+        self.timer.timeout.connect(self.update_status)
 
         self.layout = QVBoxLayout()
         self.layout.addWidget(QLabel("Available LSL Streams:"))
         self.layout.addWidget(self.stream_select)
         self.layout.addWidget(self.refresh_btn)
         self.layout.addWidget(self.dir_btn)
+        self.layout.addWidget(self.process_check)
         self.layout.addWidget(self.toggle_btn)
         self.layout.addWidget(self.status)
         self.setLayout(self.layout)
@@ -60,36 +64,43 @@ class StreamLoggerApp(QWidget):
             self.log_dir = folder
 
     def toggle_logging(self):
-        if self.active_loggers:
+        if self.active_recorders:
             # Stop logging
             self.timer.stop()
-            for logger in self.active_loggers:
-                logger.close()
-            self.active_loggers = []
+            for recorder in self.active_recorders:
+                recorder.stop()
+            overflows = sum(r.stats()["overflows"] for r in self.active_recorders)
+            self.active_recorders = []
             self.toggle_btn.setText("Start Logging")
-            self.status.setText("Logging stopped.")
+            self.process_check.setEnabled(True)
+            self.status.setText(f"Logging stopped. (queue overflows: {overflows})")
         else:
             # Start logging
             os.makedirs(self.log_dir, exist_ok=True)
-            self.active_loggers = []
+            self.active_recorders = []
             for i in range(self.stream_select.count()):
                 item = self.stream_select.item(i)
                 if item.checkState() == Qt.Checked:
                     stream = self.available[i]
-                    inlet = StreamInlet(stream)
                     fname = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{stream.name()}.bin"
                     path = os.path.join(self.log_dir, fname)
-                    logger = BinaryStreamLogger(inlet, path)
-                    self.active_loggers.append(logger)
-            self.timer.start(50)
+                    if self.process_check.isChecked():
+                        # The worker resolves the stream and opens its own inlet
+                        recorder = ProcessRecorder(stream, path)
+                    else:
+                        recorder = StreamRecorder(BinaryStreamLogger(StreamInlet(stream), path))
+                    recorder.start()
+                    self.active_recorders.append(recorder)
+            self.timer.start(1000)
             self.toggle_btn.setText("Stop Logging")
-            self.status.setText(f"Logging {len(self.active_loggers)} stream(s)...")
+            self.process_check.setEnabled(False)
+            self.update_status()
 
-    def poll_all(self):
-        for logger in self.active_loggers:
-            logger.log_chunk()
+    def update_status(self):
+        # Acquisition and writing run on the recorders' own threads; this only reports on them
+        self.status.setText(recorder_status(self.active_recorders))
 
     def closeEvent(self, event):
-        if self.active_loggers:
+        if self.active_recorders:
             self.toggle_logging()
             event.accept()
@@ -1,35 +1,113 @@
 import struct
 import os
 import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from pylsl import StreamInlet
+from pylsl import StreamInlet, local_clock
+from nml.lsl.ChunkBuffer import ChunkBuffer
+from nml.lsl.LogFormat import (
+    HEADER_MAGIC, HEADER, FORMAT_DTYPES, BLOCK_MAGIC, BLOCK_HEADER,
+    INDEX_MAGIC, INDEX_DTYPE, FOOTER, CODECS, record_dtype, encode_block, session_paths
+)
 
 
 class BinaryStreamLogger:
-    HEADER_MAGIC = b'LSLB'
-    VERSION = 1
+    HEADER_MAGIC = HEADER_MAGIC
+    VERSION = 2
 
-    def __init__(self, inlet: StreamInlet, output_path: str):
+    MAX_PENDING_BLOCKS = 16
+
+    def __init__(self, inlet: StreamInlet, output_path: str, version: int = VERSION,
+                 block_samples: int = 4096, block_seconds: float = 1.0,
+                 codec: str = None, compression_level: int = None,
+                 rotate_bytes: int = None, rotate_seconds: float = None, preallocate: bool = True,
+                 timebase: bool = False, timebase_tolerance: float = None,
+                 time_correction_interval: float = None):
+        if version not in (1, 2):
+            raise ValueError(f"Unsupported LSLB version: {version}")
+        if codec is not None and (codec not in CODECS or version < 2):
+            raise ValueError(f"Unsupported codec for version {version}: {codec}")
+        if (rotate_bytes or rotate_seconds) and version < 2:
+            raise ValueError("File rotation requires LSLB version 2.")
+        if timebase and version < 2:
+            raise ValueError("Timebase encoding requires LSLB version 2.")
+        if time_correction_interval and not timebase:
+            # Only timebase blocks have room for them; plain records would drop them after a blocking call
+            raise ValueError("time_correction_interval requires timebase=True.")
         self.inlet = inlet
-        self.outfile = open(output_path, 'wb')
+        self.version = version
+        self.block_samples = block_samples  # v2: max samples per block
+        self.block_seconds = block_seconds  # v2: max time span per block
+        self.codec = codec                  # v2: 'zlib', 'lzma' or None (raw records)
+        self.compression_level = compression_level
+
+        # Timebase mode (v2): store timestamp runs instead of one float64 per sample, and
+        # sample inlet.time_correction() every time_correction_interval seconds of data
+        self.timebase = timebase
+        self.timebase_tolerance = timebase_tolerance
+        if timebase and time_correction_interval is None:
+            time_correction_interval = 10.0
+        self.time_correction_interval = time_correction_interval
+        self._last_correction = None
+
+        # Rotation: output_path names the session; data goes to numbered segment files
+        # listed in a manifest next to them (see LogFormat.session_paths)
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.preallocate = preallocate
+        self.rotating = bool(rotate_bytes or rotate_seconds)
+        self.output_path = output_path
+        self.segments = []  # finished segments: file, n_samples, t_first, t_last
+        if self.rotating:
+            self.manifest_path, _ = session_paths(output_path, 0)
+        self.outfile = None
+
+        self._index = []      # v2: one (offset, n_samples, payload_len, t_first, t_last) per block
+        self._block_len = 0
+
+        self._encoder = None
+        self._pending_blocks = deque()
         self.write_header()
+        # Compressed blocks are encoded and written on one background thread, in order. Started
+        # only once the file and header are written, so a failure above leaves no thread behind.
+        if codec:
+            self._encoder = ThreadPoolExecutor(max_workers=1)
 
     def write_header(self):
         info = self.inlet.info()
         name = info.name()
-        name_bytes = name.encode('utf-8')
+        self.stream_name = name
         n_channels = info.channel_count()
         srate = info.nominal_srate()
         fmt_enum = info.channel_format()
 
-        # Format mapping
+        # Format mapping: LSL channel_format -> fmt_code
         format_map = {
-            1: (0, np.float32),  # float32
-            2: (1, np.float64),  # double64
+            1: 0,  # float32
+            2: 1,  # double64
+            6: 2,  # int8
+            5: 3,  # int16
+            4: 4,  # int32
+            7: 5,  # int64
         }
-        fmt_code, self.sample_dtype = format_map.get(fmt_enum, (255, None))
-        if self.sample_dtype is None:
+        fmt_code = format_map.get(fmt_enum)
+        if fmt_code is None:
             raise ValueError(f"Unsupported channel format: {fmt_enum}")
+        self.sample_dtype = FORMAT_DTYPES[fmt_code]
+        if self.timebase:
+            if srate <= 0:
+                raise ValueError("Timebase encoding needs a stream with a nominal sampling rate.")
+            if self.timebase_tolerance is None:
+                self.timebase_tolerance = 0.1 / srate
+
+        # One on-disk record: [double ts][n_channels samples], packed (no padding)
+        self.n_channels = n_channels
+        self.srate = srate
+        self.fmt_code = fmt_code
+        self.record_dtype = record_dtype(self.sample_dtype, n_channels)
+        self._records = np.empty(0, dtype=self.record_dtype)
+        self._block = np.empty(self.block_samples, dtype=self.record_dtype)
 
         # === Channel Metadata ===
         ch_names = []
@@ -42,57 +120,228 @@ class BinaryStreamLogger:
             chs = chs.next_sibling()
 
         # Get first sample to log its timestamp
-        chunk, timestamps = self.inlet.pull_chunk(timeout=1.0)
-        if not timestamps:
+        self.chunk_buffer = ChunkBuffer(self.inlet, info=info)
+        chunk, timestamps = self.chunk_buffer.pull(timeout=1.0)
+        if len(timestamps) == 0:
             raise RuntimeError("Could not read first timestamp from stream")
         start_time = timestamps[0]
         self.pending_chunk = (chunk, timestamps)
 
-        metadata = {
+        self.metadata = {
             "version": 2,
             "channel_names": ch_names,
             "units": ch_units,
             "source_id": info.source_id(),
             "start_time": start_time
         }
+        if self.codec:
+            self.metadata["codec"] = self.codec
+        if self.timebase:
+            self.metadata["timebase"] = {"tolerance": self.timebase_tolerance}
+
+        self._open_segment(start_time)
+
+    def _open_segment(self, start_time):
+        metadata = dict(self.metadata, start_time=start_time)
+        if self.rotating:
+            index = len(self.segments)
+            _, path = session_paths(self.output_path, index)
+            metadata["segment"] = index
+            metadata["session"] = os.path.basename(self.manifest_path)
+        else:
+            path = self.output_path
+        self.outfile = open(path, 'wb')
+        self.segment_path = path
+        self._offset = 0      # bytes written to the current file
+        self._index = []
+        self._segment_t0 = start_time
+
+        if self.rotating and self.preallocate:
+            self._preallocate()
 
+        name_bytes = self.stream_name.encode('utf-8')
         metadata_json = json.dumps(metadata).encode('utf-8')
         meta_len = len(metadata_json)
 
         # === Header Write ===
-        header = struct.pack(
-            '<4sIIfII',                # Magic, Version, nCh, srate, fmt_code, name_len
-            self.HEADER_MAGIC,
-            self.VERSION,
-            n_channels,
-            srate,
-            fmt_code,
+        header = HEADER.pack(
+            self.HEADER_MAGIC,         # Magic, Version, nCh, srate, fmt_code, name_len
+            self.version,
+            self.n_channels,
+            self.srate,
+            self.fmt_code,
             len(name_bytes)
         )
-        self.outfile.write(header)
-        self.outfile.write(name_bytes)
+        self._write(header)
+        self._write(name_bytes)
 
         # Write metadata block
-        self.outfile.write(struct.pack('<I', meta_len))
-        self.outfile.write(metadata_json)
+        self._write(struct.pack('<I', meta_len))
+        self._write(metadata_json)
+
+        if self.rotating:
+            self._write_manifest(complete=False)
+
+    def _preallocate(self):
+        # Reserve the segment's expected size up front so it is not grown write by write
+        size = self.rotate_bytes
+        if size is None and self.srate > 0:
+            size = int(self.rotate_seconds * self.srate * self.record_dtype.itemsize)
+        if size and hasattr(os, 'posix_fallocate'):
+            try:
+                os.posix_fallocate(self.outfile.fileno(), 0, size)
+            except OSError as e:
+                print(f"[WARNING] Could not preallocate {self.segment_path}: {e}")
 
+    def _write(self, buf):
+        self.outfile.write(buf)
+        self._offset += memoryview(buf).nbytes
 
     def log_chunk(self):
         if hasattr(self, 'pending_chunk'):
             chunk, timestamps = self.pending_chunk
             del self.pending_chunk
         else:
-            chunk, timestamps = self.inlet.pull_chunk(timeout=0.1)
+            chunk, timestamps = self.chunk_buffer.pull(timeout=0.1)
+        self.write_chunk(chunk, timestamps)
 
-        if not timestamps:
+    def write_chunk(self, chunk, timestamps):
+        if len(timestamps) == 0:
             return
 
-        arr = np.array(chunk, dtype=self.sample_dtype)  # shape: (samples, channels)
-        arr = arr.T  # shape: (channels, samples)
+        n = len(timestamps)
+        if self.version == 1:
+            # Pack the whole chunk as interleaved records and hand it to the file in one write
+            if len(self._records) < n:
+                self._records = np.empty(n, dtype=self.record_dtype)
+            records = self._records[:n]
+            records['ts'] = timestamps
+            records['x'] = chunk  # shape: (samples, channels)
+            self._write(records)
+            return
 
-        for ts, col in zip(timestamps, arr.T):
-            self.outfile.write(struct.pack('<d', ts))
-            self.outfile.write(col.tobytes())
+        # Version 2: fill the current block, writing it out each time it is full
+        start = 0
+        while start < n:
+            take = min(n - start, self.block_samples - self._block_len)
+            block = self._block[self._block_len:self._block_len + take]
+            block['ts'] = timestamps[start:start + take]
+            block['x'] = chunk[start:start + take]
+            self._block_len += take
+            start += take
+            if self._block_len == self.block_samples:
+                self.flush_block()
 
-    def close(self):
+        # Keep low-rate streams from holding a block open for too long
+        if self._block_len and self._block['ts'][self._block_len - 1] - self._block['ts'][0] >= self.block_seconds:
+            self.flush_block()
+
+    def flush_block(self):
+        n = self._block_len
+        if self.version < 2 or n == 0:
+            return
+        self._block_len = 0
+        corrections = self._take_time_corrections(self._block['ts'][n - 1])
+        if self._encoder is None:
+            self._write_block(self._block[:n], corrections)
+            return
+
+        # Bound the backlog so a slow codec pushes back on the caller instead of growing memory
+        while self._pending_blocks and (self._pending_blocks[0].done()
+                                        or len(self._pending_blocks) >= self.MAX_PENDING_BLOCKS):
+            self._pending_blocks.popleft().result()
+        self._pending_blocks.append(self._encoder.submit(self._write_block, self._block[:n].copy(), corrections))
+
+    def _take_time_corrections(self, t):
+        # LSL clock offset samples to store alongside the block ending at stream time t
+        if not self.time_correction_interval:
+            return []
+        if self._last_correction is not None and t - self._last_correction < self.time_correction_interval:
+            return []
+        self._last_correction = t
+        try:
+            return [(local_clock(), self.inlet.time_correction(timeout=2.0))]
+        except Exception as e:
+            print(f"[WARNING] time_correction() failed for {self.stream_name}: {e}")
+            return []
+
+    def _write_block(self, records, corrections=()):
+        timebase = (self.srate, self.timebase_tolerance, corrections) if self.timebase else None
+        payload = encode_block(records, self.codec, self.compression_level, timebase)
+        payload_len = memoryview(payload).nbytes
+        n = len(records)
+        t_first = float(records['ts'][0])
+        t_last = float(records['ts'][-1])
+
+        # Rotate at block boundaries, so every segment holds whole blocks
+        if self.rotating and self._index and (
+                (self.rotate_bytes and self._offset + BLOCK_HEADER.size + payload_len > self.rotate_bytes)
+                or (self.rotate_seconds and t_first - self._segment_t0 >= self.rotate_seconds)):
+            self._close_segment()
+            self._open_segment(t_first)
+
+        self._index.append((self._offset, n, payload_len, t_first, t_last))
+        self._write(BLOCK_HEADER.pack(BLOCK_MAGIC, n, t_first, t_last, self._offset, payload_len))
+        self._write(payload)
+        self.outfile.flush()  # whole blocks on disk, for readers following the file
+
+    def _close_segment(self):
+        # Index footer, then drop whatever preallocated space was not used. Only once per segment.
+        if self.outfile is None or self.outfile.closed:
+            return
+        index = np.array(self._index, dtype=INDEX_DTYPE)
+        index_offset = self._offset
+        self._write(index)
+        self._write(FOOTER.pack(index_offset, len(index), INDEX_MAGIC))
+        self.outfile.flush()
+        if self.rotating:
+            os.ftruncate(self.outfile.fileno(), self._offset)
+            self.segments.append({
+                "file": os.path.basename(self.segment_path),
+                "n_samples": int(index['n_samples'].sum()),
+                "t_first": float(index['t_first'][0]) if len(index) else None,
+                "t_last": float(index['t_last'][-1]) if len(index) else None,
+            })
         self.outfile.close()
+
+    def _write_manifest(self, complete):
+        segments = list(self.segments)
+        if not complete:
+            segments.append({"file": os.path.basename(self.segment_path), "n_samples": None,
+                             "t_first": self._segment_t0, "t_last": None})
+        manifest = {
+            "stream_name": self.stream_name,
+            "version": self.version,
+            "complete": complete,
+            "segments": segments,
+        }
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _shutdown_encoder(self):
+        # Wait for the blocks still being encoded; later calls do nothing
+        if self._encoder is None:
+            return
+        encoder, self._encoder = self._encoder, None
+        encoder.shutdown(wait=True)
+        while self._pending_blocks:
+            self._pending_blocks.popleft().result()
+
+    def close(self):
+        # Safe to call more than once, and after a failed write_header()
+        if self.outfile is None or self.outfile.closed:
+            self._shutdown_encoder()
+            return
+        try:
+            if self.version >= 2:
+                try:
+                    self.flush_block()
+                finally:
+                    self._shutdown_encoder()
+                self._close_segment()
+                if self.rotating:
+                    self._write_manifest(complete=True)
+        finally:
+            self.outfile.close()
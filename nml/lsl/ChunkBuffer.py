@@ -0,0 +1,40 @@
+import numpy as np
+
+# LSL channel_format enum -> NumPy dtype of the values liblsl writes
+LSL_DTYPES = {
+    1: np.dtype(np.float32),  # cf_float32
+    2: np.dtype(np.float64),  # cf_double64
+    4: np.dtype(np.int32),    # cf_int32
+    5: np.dtype(np.int16),    # cf_int16
+    6: np.dtype(np.int8),     # cf_int8
+    7: np.dtype(np.int64),    # cf_int64
+}
+
+
+def pull_chunk_into(inlet, data, timestamps, timeout=0.0):
+    """Pull up to len(timestamps) samples straight into `data` (samples, channels); returns the count."""
+    _, ts = inlet.pull_chunk(timeout=timeout, max_samples=len(timestamps), dest_obj=data)
+    n = len(ts)
+    if n:
+        timestamps[:n] = ts
+    return n
+
+
+class ChunkBuffer:
+    """Reusable destination for inlet.pull_chunk so steady-state pulls do not allocate arrays."""
+
+    def __init__(self, inlet, max_samples=1024, info=None):
+        info = info or inlet.info()
+        fmt = info.channel_format()
+        if fmt not in LSL_DTYPES:
+            raise ValueError(f"Unsupported channel format for buffered pulls: {fmt}")
+        self.inlet = inlet
+        self.n_channels = info.channel_count()
+        self.max_samples = max_samples
+        self.data = np.empty((max_samples, self.n_channels), dtype=LSL_DTYPES[fmt])
+        self.timestamps = np.empty(max_samples, dtype=np.float64)
+
+    def pull(self, timeout=0.0):
+        # Views stay valid until the next pull
+        n = pull_chunk_into(self.inlet, self.data, self.timestamps, timeout=timeout)
+        return self.data[:n], self.timestamps[:n]
@@ -2,38 +2,153 @@ import os
 import glob
 import json
 import struct
+from functools import cached_property, partial
+from collections.abc import MutableMapping
 import numpy as np
 import pandas as pd
 from nml.lsl.StreamLogReader import StreamLogReader
+from nml.lsl.LogFormat import SESSION_SUFFIX
+from nml.lsl.StreamLogHandle import resolve_channels, SignalView
+from nml.lsl.DataCache import DataCache
+from nml.lsl.PolyphaseResampler import PolyphaseResampler
+from nml.lsl.SessionCatalog import SessionCatalog
+
+
+class LazyMetadata(MutableMapping):
+    """Dict of metadata entries that are each loaded on first access, then kept.
+
+    An entry whose loader fails is kept as None, so membership, iteration and len() agree
+    whether or not it has been loaded yet.
+    """
+
+    def __init__(self, loaders):
+        self._loaders = dict(loaders)
+        self._values = {}
+
+    def __getitem__(self, key):
+        if key not in self._values:
+            if key not in self._loaders:
+                raise KeyError(key)
+            self._values[key] = self._loaders.pop(key)()
+        return self._values[key]
+
+    def __setitem__(self, key, value):
+        self._loaders.pop(key, None)
+        self._values[key] = value
+
+    def __delitem__(self, key):
+        if key not in self._values and key not in self._loaders:
+            raise KeyError(key)
+        self._values.pop(key, None)
+        self._loaders.pop(key, None)
+
+    def __iter__(self):
+        return iter(list(self._values) + list(self._loaders))
+
+    def __contains__(self, key):
+        # Without running the loader
+        return key in self._values or key in self._loaders
+
+    def __len__(self):
+        return len(self._values) + len(self._loaders)
+
+    def __repr__(self):
+        loaded = ", ".join(self._values)
+        pending = ", ".join(self._loaders)
+        return f"LazyMetadata(loaded=[{loaded}], not loaded=[{pending}])"
 
 
 class Data:
     def __init__(self,
                  stream_key: str,                 # e.g. '20250526_161028'
-                 metadata_key_or_suffix: str,     # e.g. '20250526_161028' or 'DEFAULT'
+                 metadata_key_or_suffix: str,     # e.g. '20250526_161028', '20250526_161028_DEFAULT' or 'DEFAULT'
                  stream_folder: str = r'logs\streams',
-                 metadata_folder: str = r'logs\metadata'):
+                 metadata_folder: str = r'logs\metadata',
+                 channels=None,                   # e.g. 'UNI*', ['COUNTER', 3] (see resolve_channels)
+                 t0: float = None,                # keep only samples with t0 <= timestamp <= t1
+                 t1: float = None,
+                 cache=None,                      # True, or a DataCache: reuse decoded arrays
+                 decimate: int = None,            # keep every n-th sample, after anti-alias filtering
+                 target_rate: float = None,       # or resample to this rate (Hz)
+                 catalog=None):                   # True, or a SessionCatalog: find files through it instead of globbing
 
         self.stream_key = stream_key
+        self.channels = channels
+        self.t0 = t0
+        self.t1 = t1
+        self.cache = DataCache() if cache is True else (cache or None)
+        self.decimate = decimate
+        self.target_rate = target_rate
         self.stream_folder = stream_folder
         self.metadata_folder = metadata_folder
 
+        # Nothing is read yet: the files are only located here, and signal, timestamps
+        # and each metadata entry are loaded the first time they are used.
+        # A catalog opened for this lookup is closed again; one passed in is left open.
+        self.catalog = SessionCatalog() if catalog is True else (catalog or None)
+        try:
+            self._find_files(metadata_key_or_suffix)
+        finally:
+            if catalog is True:
+                self.catalog.close()
+                self.catalog = None
+        self.metadata = LazyMetadata(self._metadata_loaders())   # dict of DataFrames
+        self._epoch_index = {}
+        self._signal = None          # set by assigning d.signal / d.timestamps
+        self._timestamps = None
+
+    def _find_files(self, metadata_key_or_suffix):
         # Determine if metadata_key_or_suffix is a full timestamp or a suffix
         if self._is_timestamp_format(metadata_key_or_suffix):
             self.metadata_key = metadata_key_or_suffix
             self.metadata_suffix = "DEFAULT"
+        elif self._is_timestamp_format(metadata_key_or_suffix[:15]) and metadata_key_or_suffix[15:16] == "_":
+            # A full session key as LogViewer lists it: 'YYYYMMDD_HHMMSS_SUFFIX'
+            self.metadata_key = metadata_key_or_suffix[:15]
+            self.metadata_suffix = metadata_key_or_suffix[16:]
         else:
             self.metadata_suffix = metadata_key_or_suffix
             self.metadata_key = self._find_first_metadata_key_for_suffix(self.metadata_suffix)
+        self.stream_path = self._find_stream_file()
+
+    @cached_property
+    def header(self):
+        # Name, rate, channels and sample count, from the header alone
+        return StreamLogReader(self.stream_path).read_header()
 
-        self.signal = None           # np.ndarray [n_ch, n_samples]
-        self.timestamps = None       # np.ndarray [n_samples]
-        self.metadata = {}           # dict of DataFrames
+    @cached_property
+    def stream(self):
+        # Memory-mapped where the file allows it: samples are paged in as they are used
+        return StreamLogReader(self.stream_path).open()
 
-        self._load_stream()
-        self._load_metadata()
+    @property
+    def signal(self):
+        if self._signal is not None:
+            return self._signal
+        return self._stream_arrays[1]      # np.ndarray [n_ch, n_samples], or a SignalView for compressed logs
+
+    @signal.setter
+    def signal(self, value):
+        self._signal = value
+
+    @property
+    def timestamps(self):
+        if self._timestamps is not None:
+            return self._timestamps
+        return self._stream_arrays[0]      # np.ndarray [n_samples]
+
+    @timestamps.setter
+    def timestamps(self, value):
+        self._timestamps = value
+        self._epoch_index.clear()
 
     def _find_first_metadata_key_for_suffix(self, suffix):
+        if self.catalog is not None:
+            self.catalog.refresh_metadata(self.metadata_folder)
+            key = self.catalog.first_metadata_key(self.metadata_folder, suffix)
+            if key is None:
+                raise FileNotFoundError(f"No metadata files found with suffix '{suffix}' in {self.metadata_folder}")
+            return key
         pattern = os.path.join(self.metadata_folder, f"logger_*_{suffix}_*.csv")
         files = glob.glob(pattern)
         keys = []
@@ -55,34 +170,182 @@ class Data:
         return len(s) == 15 and s[:8].isdigit() and s[9:].isdigit() and s[8] == "_"
 
     def _find_stream_file(self):
+        # A rotated recording is opened through its session manifest, not its segments
+        if self.catalog is not None:
+            self.catalog.refresh_streams(self.stream_folder)
+            path = self.catalog.find_stream(self.stream_folder, self.stream_key)
+            if path is None:
+                raise FileNotFoundError(f"No stream log found for key: {self.stream_key}")
+            return path
+        pattern = os.path.join(self.stream_folder, f"{self.stream_key}*{SESSION_SUFFIX}")
+        matches = glob.glob(pattern)
+        if matches:
+            return matches[0]
         pattern = os.path.join(self.stream_folder, f"{self.stream_key}*.bin")
         matches = glob.glob(pattern)
         if not matches:
             raise FileNotFoundError(f"No stream log found for key: {self.stream_key}")
         return matches[0]
 
-    def _load_stream(self):
-        path = self._find_stream_file()
-        reader = StreamLogReader(path)
-        result = reader.load()
+    def _columns(self):
+        columns = resolve_channels(self.header["channel_names"], self.channels)
+        return [columns] if isinstance(columns, int) else columns
 
-        self.signal = result['data'].T
-        self.timestamps = result['timestamps']
-        self.metadata['stream'] = result['metadata']
+    def _resampler(self):
+        return PolyphaseResampler.from_rates(self.header["sampling_rate"], self.target_rate, self.decimate)
 
-    def _load_metadata(self):
-        suffixes = ['state', 'parameter', 'filename', 'trials']
-        for suffix in suffixes:
-            fname = f"logger_{self.metadata_key}_{self.metadata_suffix}_{suffix}.csv"
-            path = os.path.join(self.metadata_folder, fname)
+    @cached_property
+    def _stream_arrays(self):
+        reader = StreamLogReader(self.stream_path)
+        subset = self.channels is not None or self.t0 is not None or self.t1 is not None
+
+        if self.decimate is not None or self.target_rate is not None:
+            # Resampled while streaming through the file; the full-rate signal is never loaded
+            timestamps, signal = reader.resample(self.target_rate, self.decimate, self.channels, self.t0, self.t1)
+            return timestamps, signal.reshape(len(timestamps), -1).T
+
+        if self.cache is not None:
+            # Decoded once into .npy files; later loads only map them
+            timestamps, signal = self.cache.stream_arrays(reader)
+            if not subset:
+                return timestamps, signal
+            rows = slice(0 if self.t0 is None else np.searchsorted(timestamps, self.t0, side='left'),
+                         len(timestamps) if self.t1 is None else np.searchsorted(timestamps, self.t1, side='right'))
+            return timestamps[rows], signal[self._columns(), rows]
+
+        rows = self.stream.time_slice(self.t0, self.t1)
+        columns = self._columns() if self.channels is not None else None
+        timestamps = self.stream.timestamps if not subset else self.stream.timestamps_for(rows)
+        mapped = self.stream.mapped(rows)
+        if mapped is not None:
+            # Uncompressed records: a view of the mapped file (a copy for a non-contiguous channel list)
+            if columns is None:
+                return timestamps, mapped.T
+            if columns and columns == list(range(columns[0], columns[-1] + 1)):
+                columns = slice(columns[0], columns[-1] + 1)
+            return timestamps, mapped[:, columns].T
+        # Compressed blocks (or a span across uncompressed blocks) are read only where the signal is indexed
+        return timestamps, SignalView(self.stream, rows, columns)
+
+    def _stream_metadata(self):
+        metadata = self.header["metadata"]
+        if self.channels is not None:
+            columns = self._columns()
+            metadata = dict(metadata,
+                            channel_names=[self.header["channel_names"][i] for i in columns],
+                            units=[self.header["units"][i] for i in columns])
+        if self.decimate is not None or self.target_rate is not None:
+            metadata = dict(metadata, resampled_rate=self.header["sampling_rate"] * self._resampler().rate_ratio)
+        return metadata
+
+    def _metadata_loaders(self):
+        loaders = {'stream': self._stream_metadata}
+        for suffix in ['state', 'parameter', 'filename', 'trials']:
+            path = os.path.join(self.metadata_folder,
+                                f"logger_{self.metadata_key}_{self.metadata_suffix}_{suffix}.csv")
             if os.path.exists(path):
-                try:
-                    self.metadata[suffix] = pd.read_csv(path)
-                except Exception as e:
-                    print(f"Failed to read metadata file {suffix}: {e}")
+                loaders[suffix] = partial(self._read_metadata_csv, suffix, path)
+        return loaders
+
+    def _read_metadata_csv(self, suffix, path):
+        if self.cache is not None:
+            return self.cache.frames({suffix: path}).get(suffix)
+        try:
+            return pd.read_csv(path)
+        except Exception as e:
+            print(f"Failed to read metadata file {suffix}: {e}")
+            return None
 
     def get_stream_data(self):
         return self.signal, self.timestamps
 
     def get_events(self, event_type='trials'):
-        return self.metadata.get(event_type, pd.DataFrame())
+        events = self.metadata.get(event_type)
+        return events if events is not None else pd.DataFrame()
+
+    def epochs(self, event='Recording Start', end_event=None, tmin=None, tmax=None, channels=None,
+               ragged=False, event_type='trials'):
+        """Signal segments around each `event` in the event_type table (Timestamp/Event columns).
+
+        Each epoch runs from an event to the next `end_event` after it, or over
+        [event + tmin, event + tmax] seconds. Returns a dict with 'onset' (event times) and
+        'start'/'stop' sample indices, plus either 'data', a [n_epochs, n_channels, max_len]
+        array padded with NaN, or with ragged=True 'segments', a list of [n_channels, len] views.
+        """
+        start, stop, onset = self._epoch_bounds(event, end_event, tmin, tmax, event_type)
+        columns = self._epoch_columns(channels)
+        signal = self.signal
+        result = {"onset": onset, "start": start, "stop": stop}
+        if ragged:
+            # Views of a mapped or cached signal when columns is a slice; copies of a SignalView's segments
+            result["segments"] = [signal[columns, a:b] for a, b in zip(start, stop)]
+            return result
+
+        lengths = stop - start
+        max_len = int(lengths.max()) if len(lengths) else 0
+        offsets = np.arange(max_len)
+        idx = start[:, None] + offsets
+        valid = offsets < lengths[:, None]
+        # One gather for all epochs: [n_channels, n_epochs * max_len] -> [n_epochs, n_channels, max_len]
+        flat = np.where(valid, idx, 0).ravel()
+        if isinstance(signal, SignalView):
+            data = signal.select(columns, flat)
+        elif isinstance(columns, list):
+            data = signal[np.ix_(columns, flat)]
+        else:
+            data = signal[columns, flat]
+        data = np.asarray(data, dtype=np.result_type(signal.dtype, np.float32))
+        data = data.reshape(len(data), len(start), max_len).transpose(1, 0, 2)
+        data[~np.broadcast_to(valid[:, None, :], data.shape)] = np.nan
+        result["data"] = data
+        return result
+
+    def _epoch_bounds(self, event, end_event, tmin, tmax, event_type):
+        # Event times mapped to sample indices with one searchsorted, kept for repeated calls
+        key = (event_type, event, end_event, tmin, tmax)
+        if key in self._epoch_index:
+            return self._epoch_index[key]
+        if end_event is None and tmax is None:
+            raise ValueError("Give end_event or tmax.")
+
+        events = self.get_events(event_type)
+        if events.empty:
+            times = np.empty(0)
+            ends = np.empty(0)
+        else:
+            times = np.sort(events.loc[events['Event'] == event, 'Timestamp'].to_numpy(dtype=np.float64))
+            if end_event is not None:
+                ends = np.sort(events.loc[events['Event'] == end_event, 'Timestamp'].to_numpy(dtype=np.float64))
+
+        if end_event is not None:
+            # Pair each event with the first end_event at or after it
+            j = np.searchsorted(ends, times, side='left')
+            paired = j < len(ends)
+            if not paired.all():
+                print(f"[WARNING] {np.count_nonzero(~paired)} '{event}' event(s) without a following '{end_event}' were skipped.")
+            times = times[paired]
+            t_start, t_stop = times, ends[j[paired]]
+            if tmin is not None:
+                t_start = t_start + tmin
+            if tmax is not None:
+                t_stop = t_stop + tmax
+        else:
+            t_start = times + (tmin or 0.0)
+            t_stop = times + tmax
+
+        timestamps = self.timestamps
+        start = np.searchsorted(timestamps, t_start, side='left')
+        stop = np.maximum(np.searchsorted(timestamps, t_stop, side='right'), start)
+        self._epoch_index[key] = (start, stop, times)
+        return self._epoch_index[key]
+
+    def _epoch_columns(self, channels):
+        # Channels of this Data (after any selection at load time); a slice keeps segments as views
+        if channels is None:
+            return slice(None)
+        columns = resolve_channels(self.metadata['stream']['channel_names'], channels)
+        if isinstance(columns, int):
+            return slice(columns, columns + 1)
+        if len(columns) and np.all(np.diff(columns) == 1):
+            return slice(columns[0], columns[-1] + 1)
+        return columns
@@ -0,0 +1,123 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+import pandas as pd
+
+
+class DataCache:
+    """On-disk cache of decoded stream arrays (.npy, opened as memmaps) and parsed metadata CSVs.
+
+    Entries are keyed by the source files' paths, sizes and mtimes, the LSLB version and
+    CACHE_VERSION, so a file that changes simply misses. The least recently used entries
+    are evicted once the cache holds more than max_bytes.
+    """
+
+    CACHE_VERSION = 1
+    BUILD_CHUNK_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, cache_dir=None, max_bytes=20 * 1024 ** 3):
+        self.cache_dir = cache_dir or os.path.join(os.path.expanduser('~'), '.cache', 'nml_lsl')
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def stream_arrays(self, reader):
+        # -> (timestamps [n_samples], signal [n_channels, n_samples]), both read-only memmaps
+        version = reader.read_header()["version"]
+        key = self._key(f'stream-v{version}', reader.segment_paths() + ([reader.path] if reader.manifest else []))
+        entry = self._entry(key)
+        if entry is None:
+            entry = self._build(key, lambda folder: self._write_stream(reader, folder))
+        return (np.load(os.path.join(entry, 'timestamps.npy'), mmap_mode='r'),
+                np.load(os.path.join(entry, 'signal.npy'), mmap_mode='r'))
+
+    def frames(self, csv_paths):
+        # {name: path} of CSV files -> {name: DataFrame}, parsed once per file version
+        csv_paths = {name: path for name, path in csv_paths.items() if os.path.exists(path)}
+        if not csv_paths:
+            return {}
+        key = self._key('frames', [csv_paths[name] for name in sorted(csv_paths)])
+        entry = self._entry(key)
+        if entry is None:
+            entry = self._build(key, lambda folder: self._write_frames(csv_paths, folder))
+        return {name: pd.read_pickle(os.path.join(entry, f"{name}.pkl")) for name in csv_paths
+                if os.path.exists(os.path.join(entry, f"{name}.pkl"))}
+
+    def clear(self):
+        for name in os.listdir(self.cache_dir):
+            shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+
+    def _key(self, kind, paths):
+        parts = [kind, str(self.CACHE_VERSION)]
+        for path in paths:
+            st = os.stat(path)
+            parts.append(f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}")
+        return hashlib.sha1("\n".join(parts).encode('utf-8')).hexdigest()
+
+    def _entry(self, key):
+        folder = os.path.join(self.cache_dir, key)
+        if not os.path.isdir(folder):
+            return None
+        os.utime(folder)  # mark as recently used
+        return folder
+
+    def _build(self, key, write):
+        # Write into a private folder, then publish it with one rename
+        tmp = tempfile.mkdtemp(prefix='.build_', dir=self.cache_dir)
+        try:
+            write(tmp)
+            folder = os.path.join(self.cache_dir, key)
+            try:
+                os.replace(tmp, folder)
+            except OSError:
+                shutil.rmtree(tmp, ignore_errors=True)  # another process built it first
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        self._evict(keep=key)
+        return folder
+
+    def _write_stream(self, reader, folder):
+        # Decode a bounded slab at a time, so building never holds the whole recording
+        with reader.open() as handle:
+            n_samples, n_channels = handle.shape
+            timestamps = np.lib.format.open_memmap(os.path.join(folder, 'timestamps.npy'), mode='w+',
+                                                   dtype='<f8', shape=(n_samples,))
+            signal = np.lib.format.open_memmap(os.path.join(folder, 'signal.npy'), mode='w+',
+                                               dtype=handle.dtype, shape=(n_channels, n_samples))
+            step = max(1, self.BUILD_CHUNK_BYTES // max(1, n_channels * handle.dtype.itemsize))
+            for start in range(0, n_samples, step):
+                rows = slice(start, min(start + step, n_samples))
+                timestamps[rows] = handle.timestamps_for(rows)
+                signal[:, rows] = handle[rows].T
+            timestamps.flush()
+            signal.flush()
+            del timestamps, signal
+            with open(os.path.join(folder, 'metadata.json'), 'w') as f:
+                json.dump({"source": reader.path, "metadata": handle.metadata}, f)
+
+    def _write_frames(self, csv_paths, folder):
+        for name, path in csv_paths.items():
+            try:
+                pd.read_csv(path).to_pickle(os.path.join(folder, f"{name}.pkl"))
+            except Exception as e:
+                print(f"Failed to read metadata file {name}: {e}")
+
+    def _evict(self, keep=None):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            folder = os.path.join(self.cache_dir, name)
+            if name.startswith('.') or not os.path.isdir(folder):
+                continue
+            size = sum(os.path.getsize(os.path.join(folder, f)) for f in os.listdir(folder))
+            entries.append((os.path.getmtime(folder), size, name, folder))
+        total = sum(e[1] for e in entries)
+        for _, size, name, folder in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(folder, ignore_errors=True)
+            total -= size
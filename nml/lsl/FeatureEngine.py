@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from scipy.signal import welch
+from nml.lsl.Data import Data
+from nml.lsl.LogFormat import SESSION_SUFFIX
+from nml.lsl.SessionCatalog import SessionCatalog
+
+
+def rms(x, srate):
+    return np.sqrt(np.mean(np.square(x, dtype=np.float64), axis=-1))
+
+
+def mav(x, srate):
+    return np.mean(np.abs(x), axis=-1, dtype=np.float64)
+
+
+def waveform_length(x, srate):
+    return np.sum(np.abs(np.diff(x.astype(np.float64), axis=-1)), axis=-1)
+
+
+def median_frequency(x, srate, nperseg=256):
+    # Frequency splitting the Welch power spectrum into halves of equal power
+    freqs, psd = welch(x, fs=srate, nperseg=min(nperseg, x.shape[-1]), axis=-1)
+    cumulative = np.cumsum(psd, axis=-1)
+    half = cumulative[..., -1:] / 2
+    mdf = freqs[np.argmax(cumulative >= half, axis=-1)]
+    return np.where(cumulative[..., -1] > 0, mdf, np.nan)
+
+
+# feature name -> f(segment [n_channels, n_samples], srate) -> [n_channels]
+FEATURES = {
+    'rms': rms,
+    'mav': mav,
+    'wl': waveform_length,
+    'mdf': median_frequency,
+}
+
+
+def session_features(stream_key, metadata_key, settings):
+    # One session's tidy feature rows: one per trial and channel. Runs in a worker process.
+    d = Data(stream_key, metadata_key, settings["stream_folder"], settings["metadata_folder"],
+             channels=settings["channels"], catalog=False)
+    epochs = d.epochs(settings["event"], end_event=settings["end_event"], tmin=settings["tmin"],
+                      tmax=settings["tmax"], ragged=True)
+    srate = d.header["sampling_rate"]
+    channel_names = d.metadata['stream']['channel_names']
+    trials = d.get_events('trials')
+    files = dict(zip(trials['Timestamp'], trials['File'])) if 'File' in trials else {}
+
+    columns = {"session": [], "metadata": [], "trial": [], "file": [], "t_start": [], "t_end": [],
+               "n_samples": [], "channel": []}
+    columns.update({name: [] for name in settings["features"]})
+    timestamps = d.timestamps
+    for trial, (segment, onset, start, stop) in enumerate(zip(epochs["segments"], epochs["onset"],
+                                                                epochs["start"], epochs["stop"])):
+        n_channels, n = segment.shape
+        columns["session"] += [stream_key] * n_channels
+        columns["metadata"] += [metadata_key] * n_channels
+        columns["trial"] += [trial] * n_channels
+        columns["file"] += [files.get(onset)] * n_channels
+        columns["t_start"] += [timestamps[start] if n else np.nan] * n_channels
+        columns["t_end"] += [timestamps[stop - 1] if n else np.nan] * n_channels
+        columns["n_samples"] += [n] * n_channels
+        columns["channel"] += list(channel_names)
+        # Every feature for all channels of the trial at once
+        x = np.asarray(segment)
+        for name in settings["features"]:
+            values = FEATURES[name](x, srate) if n > 1 else np.full(n_channels, np.nan)
+            columns[name] += list(values)
+    return pd.DataFrame(columns)
+
+
+class FeatureEngine:
+    """Per-trial, per-channel EMG features over many sessions, computed in worker processes.
+
+    Each session's rows are saved as a part file as soon as it finishes, in <out>.parts/,
+    so an interrupted run resumes with the sessions it had not done. Once all sessions
+    are done, the parts are combined into one table (.csv, or .parquet with pyarrow).
+    """
+
+    def __init__(self, stream_folder=r'logs\streams', metadata_folder=r'logs\metadata', channels=None,
+                 features=('rms', 'mav', 'wl', 'mdf'), event='Recording Start', end_event='Recording End',
+                 tmin=None, tmax=None):
+        unknown = [name for name in features if name not in FEATURES]
+        if unknown:
+            raise ValueError(f"Unknown features: {unknown}; choose from {list(FEATURES)}")
+        self.settings = {
+            "stream_folder": stream_folder,
+            "metadata_folder": metadata_folder,
+            "channels": channels,
+            "features": list(features),
+            "event": event,
+            "end_event": end_event,
+            "tmin": tmin,
+            "tmax": tmax,
+        }
+
+    def find_sessions(self, suffix=None, catalog=None):
+        # (stream key, metadata session key) for every log whose time span holds a session with trials
+        if catalog is None:
+            with SessionCatalog() as catalog:
+                return self.find_sessions(suffix, catalog)
+        stream_folder, metadata_folder = self.settings["stream_folder"], self.settings["metadata_folder"]
+        catalog.refresh_streams(stream_folder)
+        catalog.refresh_metadata(metadata_folder)
+        jobs = []
+        for row in catalog.streams(stream_folder):
+            if row["t_start"] is None:
+                continue
+            stream_key = row["name"].replace(SESSION_SUFFIX, '').replace('.bin', '')
+            for session in catalog.metadata_sessions(metadata_folder, suffix, row["t_start"], row["t_end"]):
+                if 'trials' in session["kinds"]:
+                    jobs.append((stream_key, f"{session['key']}_{session['suffix']}"))
+        return jobs
+
+    def run(self, sessions, out_path, workers=None, fresh=False):
+        # sessions: (stream key, metadata key or suffix) pairs. Returns the combined table.
+        fmt = self._format(out_path)
+        parts_dir = os.path.splitext(out_path)[0] + '.parts'
+        self._prepare_parts(parts_dir, fresh)
+
+        pending = [(s, m) for s, m in sessions if not os.path.exists(self._part_path(parts_dir, s, m))]
+        done = len(sessions) - len(pending)
+        if done:
+            print(f"Resuming: {done} of {len(sessions)} sessions already done")
+        failed = {}
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(session_features, s, m, self.settings): (s, m) for s, m in pending}
+            for future in as_completed(futures):
+                stream_key, metadata_key = futures[future]
+                done += 1
+                try:
+                    table = future.result()
+                except Exception as e:
+                    failed[(stream_key, metadata_key)] = str(e)
+                    print(f"[ERROR] [{done}/{len(sessions)}] {stream_key} / {metadata_key}: {e}")
+                    continue
+                part = self._part_path(parts_dir, stream_key, metadata_key)
+                table.to_csv(part + '.tmp', index=False)
+                os.replace(part + '.tmp', part)
+                print(f"[{done}/{len(sessions)}] {stream_key} / {metadata_key}: "
+                      f"{table['trial'].nunique()} trials ({time.perf_counter() - started:.1f} s)")
+
+        if failed:
+            print(f"[WARNING] {len(failed)} session(s) failed; run again to retry them. "
+                  f"Finished sessions are kept in {parts_dir}")
+            return None
+        parts = [self._part_path(parts_dir, s, m) for s, m in sessions]
+        table = pd.concat([pd.read_csv(p) for p in parts], ignore_index=True) if parts else pd.DataFrame()
+        self._write_table(table, out_path, fmt)
+        shutil.rmtree(parts_dir, ignore_errors=True)
+        print(f"Wrote {len(table)} rows to {out_path}")
+        return table
+
+    def _prepare_parts(self, parts_dir, fresh):
+        # Parts from a run with other settings cannot be reused
+        settings_path = os.path.join(parts_dir, 'settings.json')
+        settings = json.loads(json.dumps(self.settings, default=str))
+        if os.path.isdir(parts_dir) and not fresh:
+            try:
+                with open(settings_path, 'r') as f:
+                    if json.load(f) == settings:
+                        return
+            except (OSError, ValueError):
+                pass
+            print(f"[WARNING] {parts_dir} was written with other settings; starting over.")
+        shutil.rmtree(parts_dir, ignore_errors=True)
+        os.makedirs(parts_dir)
+        with open(settings_path, 'w') as f:
+            json.dump(settings, f)
+
+    @staticmethod
+    def _part_path(parts_dir, stream_key, metadata_key):
+        return os.path.join(parts_dir, f"{stream_key}__{metadata_key}.csv")
+
+    @staticmethod
+    def _format(out_path):
+        ext = os.path.splitext(out_path)[1].lower()
+        if ext == '.parquet':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow), or write .csv")
+            return 'parquet'
+        if ext == '.csv':
+            return 'csv'
+        raise ValueError(f"Cannot tell the output format from {out_path}; use .csv or .parquet")
+
+    @staticmethod
+    def _write_table(table, out_path, fmt):
+        tmp_path = out_path + '.part'
+        if fmt == 'parquet':
+            table.to_parquet(tmp_path, index=False)
+        else:
+            table.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, out_path)
@@ -1,19 +1,22 @@
 from PyQt5.QtCore import QThread, pyqtSignal
+from nml.lsl.ChunkBuffer import ChunkBuffer
 
 class LSLWorker(QThread):
-    new_data = pyqtSignal(list, list)  # use object for generic list/array
+    new_data = pyqtSignal(object, object)  # (samples, channels) array, timestamps array
 
     def __init__(self, inlet, poll_interval=0.001):
         super().__init__()
         self.inlet = inlet
         self.poll_interval = poll_interval
+        self.chunk_buffer = ChunkBuffer(inlet)
         self._running = True
 
     def run(self):
         while self._running:
-            chunk, timestamps = self.inlet.pull_chunk(timeout=self.poll_interval)
-            if chunk:
-                self.new_data.emit(chunk, timestamps)
+            chunk, timestamps = self.chunk_buffer.pull(timeout=self.poll_interval)
+            if len(timestamps):
+                # Queued across threads, so hand over copies rather than views of the pull buffer
+                self.new_data.emit(chunk.copy(), timestamps.copy())
 
     def stop(self):
         self._running = False
@@ -0,0 +1,185 @@
+import os
+import glob
+import json
+import shutil
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from nml.lsl.StreamLogReader import StreamLogReader
+from nml.lsl.LogFormat import SESSION_SUFFIX
+
+
+class LogExporter:
+    """Converts stream logs to HDF5, NPZ or CSV one chunk at a time.
+
+    Memory use depends on chunk_bytes, not on the recording length. Metadata CSVs
+    (state, parameter, filename, trials) are exported as tables alongside the stream.
+    """
+
+    FORMATS = ('hdf5', 'npz', 'csv')
+    EXTENSIONS = {'hdf5': '.h5', 'npz': '.npz', 'csv': '.csv'}
+    METADATA_TYPES = ('state', 'parameter', 'filename', 'trials')
+    CSV_WARN_SAMPLES = 10_000_000  # samples x channels
+
+    def __init__(self, chunk_bytes=32 * 1024 * 1024, compression=None):
+        self.chunk_bytes = chunk_bytes
+        self.compression = compression  # HDF5 only, e.g. 'gzip'
+
+    @staticmethod
+    def metadata_csvs(metadata_folder, session_key):
+        # session_key as LogViewer lists it: '<YYYYMMDD_HHMMSS>_<suffix>'
+        return {kind: path for kind in LogExporter.METADATA_TYPES
+                for path in [os.path.join(metadata_folder, f"logger_{session_key}_{kind}.csv")]
+                if os.path.exists(path)}
+
+    def export(self, log_path, out_path, fmt=None, metadata_csvs=None):
+        fmt = fmt or self._format_from_extension(out_path)
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        tables = {name: pd.read_csv(path) for name, path in (metadata_csvs or {}).items()}
+        # Written under a temporary name, so a failed export never looks like a finished one
+        tmp_path = out_path + '.part'
+        try:
+            with StreamLogReader(log_path).open() as handle:
+                if fmt == 'hdf5':
+                    self._export_hdf5(handle, tmp_path, tables)
+                elif fmt == 'npz':
+                    self._export_npz(handle, tmp_path, tables)
+                else:
+                    self._export_csv(handle, tmp_path, metadata_csvs or {}, out_path)
+            os.replace(tmp_path, out_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return out_path
+
+    def export_many(self, jobs, workers=None):
+        # jobs: (log_path, out_path, fmt, metadata_csvs) tuples, run in worker processes.
+        # Returns {out_path: None or the error message}
+        results = {}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(self.export, *job): job[1] for job in jobs}
+            for future in as_completed(futures):
+                out_path = futures[future]
+                try:
+                    future.result()
+                    results[out_path] = None
+                    print(f"Exported {out_path}")
+                except Exception as e:
+                    results[out_path] = str(e)
+                    print(f"[ERROR] Export to {out_path} failed: {e}")
+        return results
+
+    def _chunks(self, handle):
+        n_samples, n_channels = handle.shape
+        step = max(1, self.chunk_bytes // max(1, n_channels * handle.dtype.itemsize + 8))
+        for start in range(0, n_samples, step):
+            rows = slice(start, min(start + step, n_samples))
+            yield rows, handle.timestamps_for(rows), handle[rows]
+
+    def _attributes(self, handle):
+        return {
+            "stream_name": handle.stream_name,
+            "sampling_rate": handle.sampling_rate,
+            "channel_names": list(handle.channel_names),
+            "units": list(handle.units),
+            "metadata": json.dumps(handle.metadata),
+        }
+
+    def _export_hdf5(self, handle, path, tables):
+        try:
+            import h5py
+        except ImportError:
+            raise RuntimeError("HDF5 export needs h5py (pip install h5py).")
+        n_samples, n_channels = handle.shape
+        chunk_rows = max(1, min(n_samples, 65536 // max(1, n_channels)))
+        with h5py.File(path, 'w') as f:
+            for key, value in self._attributes(handle).items():
+                f.attrs[key] = value
+            ts = f.create_dataset('timestamps', shape=(n_samples,), dtype='<f8',
+                                  chunks=(chunk_rows,) if n_samples else None, compression=self.compression)
+            data = f.create_dataset('data', shape=(n_samples, n_channels), dtype=handle.dtype,
+                                    chunks=(chunk_rows, n_channels) if n_samples else None,
+                                    compression=self.compression)
+            for rows, t, x in self._chunks(handle):
+                ts[rows] = t
+                data[rows] = x
+            group = f.create_group('metadata')
+            for name, df in tables.items():
+                table = group.create_group(name)
+                for column in df.columns:
+                    values = df[column].to_numpy()
+                    if values.dtype == object:
+                        values = values.astype(str).astype(object)
+                        table.create_dataset(column, data=values, dtype=h5py.string_dtype())
+                    else:
+                        table.create_dataset(column, data=values)
+
+    def _export_npz(self, handle, path, tables):
+        # Written entry by entry, streaming the big arrays into the zip as .npy files
+        n_samples, n_channels = handle.shape
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED, allowZip64=True) as zf:
+            with zf.open('timestamps.npy', 'w', force_zip64=True) as entry:
+                self._write_npy_header(entry, np.dtype('<f8'), (n_samples,))
+                for t in self._timestamp_chunks(handle):
+                    entry.write(np.ascontiguousarray(t, dtype='<f8').tobytes())
+            with zf.open('data.npy', 'w', force_zip64=True) as entry:
+                self._write_npy_header(entry, handle.dtype, (n_samples, n_channels))
+                for _, _, x in self._chunks(handle):
+                    entry.write(np.ascontiguousarray(x).tobytes())
+            small = {key: np.array(value) for key, value in self._attributes(handle).items()}
+            small.update({f"metadata_{name}": self._records(df) for name, df in tables.items()})
+            for key, value in small.items():
+                with zf.open(f"{key}.npy", 'w') as entry:
+                    np.lib.format.write_array(entry, value, allow_pickle=False)
+
+    def _timestamp_chunks(self, handle):
+        n_samples = len(handle)
+        step = max(1, self.chunk_bytes // 8)
+        for start in range(0, n_samples, step):
+            yield handle.timestamps_for(slice(start, min(start + step, n_samples)))
+
+    @staticmethod
+    def _records(df):
+        # Structured array of a table, with text columns as fixed-width unicode (no pickling)
+        columns = [df[c].to_numpy() for c in df.columns]
+        columns = [values.astype(str) if values.dtype == object else values for values in columns]
+        return np.rec.fromarrays(columns, names=[str(c) for c in df.columns])
+
+    @staticmethod
+    def _write_npy_header(f, dtype, shape):
+        header = {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False, 'shape': shape}
+        np.lib.format.write_array_header_2_0(f, header)
+
+    def _export_csv(self, handle, path, metadata_csvs, out_path):
+        n_samples, n_channels = handle.shape
+        if n_samples * n_channels > self.CSV_WARN_SAMPLES:
+            print(f"[WARNING] {handle.stream_name}: {n_samples:,} x {n_channels} samples as CSV; "
+                  f"consider HDF5 or NPZ for recordings this large.")
+        fmt = ['%.6f'] + (['%.9g'] if handle.dtype.kind == 'f' else ['%d']) * n_channels
+        with open(path, 'w', newline='') as f:
+            f.write(",".join(["timestamp"] + list(handle.channel_names)) + "\n")
+            for _, t, x in self._chunks(handle):
+                np.savetxt(f, np.column_stack((t, x)), delimiter=',', fmt=fmt)
+        base = os.path.splitext(out_path)[0]
+        for name, csv_path in metadata_csvs.items():
+            shutil.copyfile(csv_path, f"{base}_{name}.csv")
+
+    @staticmethod
+    def _format_from_extension(path):
+        ext = os.path.splitext(path)[1].lower()
+        for fmt, fmt_ext in LogExporter.EXTENSIONS.items():
+            if ext == fmt_ext or (fmt == 'hdf5' and ext == '.hdf5'):
+                return fmt
+        raise ValueError(f"Cannot tell the export format from {path}; pass fmt=")
+
+    @staticmethod
+    def find_logs(folder):
+        # Logs in a folder, listing rotated sessions once by their manifest
+        logs = sorted(glob.glob(os.path.join(folder, f'*{SESSION_SUFFIX}')))
+        segments = set()
+        for manifest in logs:
+            segments.update(os.path.abspath(p) for p in StreamLogReader(manifest).segment_paths())
+        logs += [p for p in sorted(glob.glob(os.path.join(folder, '*.bin'))) if os.path.abspath(p) not in segments]
+        return logs
@@ -0,0 +1,179 @@
+import lzma
+import os
+import struct
+import zlib
+import numpy as np
+
+# === LSLB file layout shared by BinaryStreamLogger and StreamLogReader ===
+#
+# Header (all versions):
+#   '<4sIIfII' magic, version, n_channels, srate, fmt_code, name_len
+#   name (utf-8), '<I' metadata length, metadata (json, utf-8)
+#
+# Version 1 body: flat run of records [double ts][n_channels samples]
+#
+# Version 2 body: blocks of records, each preceded by BLOCK_HEADER, then an
+# index footer (one INDEX_DTYPE row per block) and a fixed-size FOOTER at EOF.
+# With a "codec" in the metadata, each block payload is encode_block() output
+# instead of raw records.
+
+HEADER_MAGIC = b'LSLB'
+HEADER = struct.Struct('<4sIIfII')
+
+# fmt_code -> sample dtype
+FORMAT_DTYPES = {
+    0: np.dtype('<f4'),  # float32
+    1: np.dtype('<f8'),  # double64
+    2: np.dtype('i1'),   # int8
+    3: np.dtype('<i2'),  # int16
+    4: np.dtype('<i4'),  # int32
+    5: np.dtype('<i8'),  # int64
+}
+
+BLOCK_MAGIC = b'LBLK'
+BLOCK_HEADER = struct.Struct('<4sIddQI')  # magic, n_samples, t_first, t_last, offset, payload_len
+
+INDEX_MAGIC = b'LIDX'
+INDEX_DTYPE = np.dtype([
+    ('offset', '<u8'),       # byte offset of the block header in the file
+    ('n_samples', '<u4'),
+    ('payload_len', '<u4'),
+    ('t_first', '<f8'),
+    ('t_last', '<f8'),
+])
+FOOTER = struct.Struct('<QQ4s')  # index offset, n_blocks, magic
+
+
+# Rotated recordings: '<base>_000.bin', '<base>_001.bin', ... plus a '<base>.session.json'
+# manifest listing the segments in order. Each segment is a complete v2 file.
+SESSION_SUFFIX = '.session.json'
+
+
+def session_paths(output_path, segment):
+    # -> (manifest path, path of the given segment) for a session logged to output_path
+    base, _ = os.path.splitext(output_path)
+    return base + SESSION_SUFFIX, f"{base}_{segment:03d}.bin"
+
+
+def record_dtype(sample_dtype, n_channels):
+    # One packed (unaligned) record: [double ts][n_channels samples]
+    return np.dtype([('ts', '<f8'), ('x', sample_dtype, (n_channels,))])
+
+
+# codec name -> (compress(bytes, level), decompress(bytes))
+CODECS = {
+    'zlib': (lambda buf, level: zlib.compress(buf, 6 if level is None else level), zlib.decompress),
+    'lzma': (lambda buf, level: lzma.compress(buf, preset=6 if level is None else level), lzma.decompress),
+}
+
+
+def _shuffle(values):
+    # Byte planes: every value's byte 0, then every value's byte 1, ...
+    return values.view(np.uint8).reshape(-1, values.dtype.itemsize).T.tobytes()
+
+
+def _unshuffle(buf, dtype, count):
+    planes = np.frombuffer(buf, dtype=np.uint8).reshape(dtype.itemsize, count)
+    return np.ascontiguousarray(planes.T).view(dtype).ravel()
+
+
+# Timebase mode: instead of per-sample timestamps, a block stores runs of
+# (t0, srate, count) plus exact values for samples that stray beyond the
+# tolerance, and any inlet.time_correction() samples taken meanwhile.
+TIMEBASE_HEADER = struct.Struct('<IIId')  # n_runs, n_exceptions, n_corrections, max_error
+RUN_DTYPE = np.dtype([('t0', '<f8'), ('srate', '<f8'), ('count', '<u4')])
+EXCEPTION_DTYPE = np.dtype([('index', '<u4'), ('ts', '<f8')])
+CORRECTION_DTYPE = np.dtype([('local_time', '<f8'), ('offset', '<f8')])
+
+
+def reconstruct_timebase(runs, n_samples):
+    counts = runs['count'].astype(np.int64)
+    starts = np.cumsum(counts) - counts
+    k = np.arange(n_samples) - np.repeat(starts, counts)
+    return np.repeat(runs['t0'], counts) + k / np.repeat(runs['srate'], counts)
+
+
+def encode_timebase(timestamps, srate, tolerance, corrections=()):
+    ts = np.asarray(timestamps, dtype=np.float64)
+    n = len(ts)
+
+    # A new run starts wherever the spacing departs from the nominal period (gaps, chunk jitter).
+    # Each run's rate is measured end to end, which absorbs slow clock drift.
+    starts = np.concatenate(([0], np.flatnonzero(np.abs(np.diff(ts) - 1.0 / srate) > tolerance) + 1))
+    counts = np.diff(np.append(starts, n))
+    ends = starts + counts - 1
+    runs = np.empty(len(starts), dtype=RUN_DTYPE)
+    runs['t0'] = ts[starts]
+    runs['count'] = counts
+    with np.errstate(divide='ignore', invalid='ignore'):
+        runs['srate'] = np.where(counts > 1, (counts - 1) / (ts[ends] - ts[starts]), srate)
+
+    error = np.abs(ts - reconstruct_timebase(runs, n))
+    exceptions = np.empty(np.count_nonzero(error > tolerance), dtype=EXCEPTION_DTYPE)
+    exceptions['index'] = np.flatnonzero(error > tolerance)
+    exceptions['ts'] = ts[exceptions['index']]
+    error[exceptions['index']] = 0.0
+    max_error = float(error.max()) if n else 0.0
+
+    corrections = np.array(corrections, dtype=CORRECTION_DTYPE)
+    return (TIMEBASE_HEADER.pack(len(runs), len(exceptions), len(corrections), max_error)
+            + runs.tobytes() + exceptions.tobytes() + corrections.tobytes())
+
+
+def decode_timebase(buf, n_samples):
+    # -> (timestamps, time corrections, max reconstruction error, bytes consumed)
+    n_runs, n_exceptions, n_corrections, max_error = TIMEBASE_HEADER.unpack_from(buf)
+    pos = TIMEBASE_HEADER.size
+    runs = np.frombuffer(buf, dtype=RUN_DTYPE, count=n_runs, offset=pos)
+    pos += runs.nbytes
+    exceptions = np.frombuffer(buf, dtype=EXCEPTION_DTYPE, count=n_exceptions, offset=pos)
+    pos += exceptions.nbytes
+    corrections = np.frombuffer(buf, dtype=CORRECTION_DTYPE, count=n_corrections, offset=pos)
+    pos += corrections.nbytes
+
+    timestamps = reconstruct_timebase(runs, n_samples)
+    timestamps[exceptions['index']] = exceptions['ts']
+    return timestamps, corrections, max_error, pos
+
+
+def encode_block(records, codec=None, level=None, timebase=None):
+    # timebase: None, or (srate, tolerance, corrections) to replace per-sample timestamps.
+    # Lossless otherwise: with a codec, timestamps are deltas of their int64 bit patterns,
+    # channel data is stored channel-major, and both are byte-shuffled before compression.
+    if timebase is not None:
+        ts_part = encode_timebase(records['ts'], *timebase)
+    elif codec is not None:
+        ts_bits = np.ascontiguousarray(records['ts']).view('<i8')
+        ts_part = _shuffle(np.diff(ts_bits, prepend=np.int64(0)))
+    else:
+        return records  # plain records
+
+    if codec is None:
+        return ts_part + np.ascontiguousarray(records['x']).tobytes()
+    data = np.ascontiguousarray(records['x'].T)  # (channels, samples)
+    compress = CODECS[codec][0]
+    return compress(ts_part + _shuffle(data), level)
+
+
+def decode_block(payload, codec, rec_dtype, n_samples, timebase=False):
+    # -> (records, time corrections, max timestamp reconstruction error)
+    buf = payload if codec is None else CODECS[codec][1](payload)
+    sample_dtype, (n_channels,) = rec_dtype['x'].base, rec_dtype['x'].shape
+    records = np.empty(n_samples, dtype=rec_dtype)
+    corrections = np.empty(0, dtype=CORRECTION_DTYPE)
+    max_error = 0.0
+
+    if timebase:
+        records['ts'], corrections, max_error, ts_bytes = decode_timebase(buf, n_samples)
+    elif codec is not None:
+        ts_bytes = 8 * n_samples
+        records['ts'] = np.cumsum(_unshuffle(buf[:ts_bytes], np.dtype('<i8'), n_samples)).view('<f8')
+    else:
+        return np.frombuffer(buf, dtype=rec_dtype, count=n_samples), corrections, max_error
+
+    count = n_samples * n_channels
+    if codec is None:
+        records['x'] = np.frombuffer(buf, dtype=sample_dtype, count=count, offset=ts_bytes).reshape(n_samples, n_channels)
+    else:
+        records['x'] = _unshuffle(buf[ts_bytes:], sample_dtype, count).reshape(n_channels, n_samples).T
+    return records, corrections, max_error
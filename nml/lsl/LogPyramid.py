@@ -0,0 +1,162 @@
+import os
+import json
+import numpy as np
+from nml.lsl.StreamLogReader import StreamLogReader
+from nml.lsl.LogFormat import SESSION_SUFFIX
+
+
+class LogPyramid:
+    """Per-channel min/max/mean summaries of a stream log at power-of-two decimation levels.
+
+    Level k holds one bin per base_bin * 2**k samples. The pyramid is built in one streaming
+    pass and kept as a sidecar next to the log (<log>.pyramid.npz); query() picks the level
+    that gives about `width` points for a time span, or the raw samples when the span is short.
+    Rotated sessions get one sidecar for the whole session (<base>.pyramid.npz).
+    """
+
+    SUFFIX = '.pyramid.npz'
+    VERSION = 1
+
+    def __init__(self, log_path, levels, base_bin):
+        self.log_path = log_path
+        self.levels = levels      # [{'t', 'count', 'min', 'max', 'mean'}] finest first
+        self.base_bin = base_bin
+        self._handle = None
+
+    @classmethod
+    def open(cls, log_path, build=True, base_bin=128):
+        # The sidecar if it matches the log as it is now, otherwise a fresh build
+        sidecar = cls.sidecar_path(log_path)
+        if os.path.exists(sidecar):
+            try:
+                with np.load(sidecar) as f:
+                    meta = json.loads(str(f['meta']))
+                    if meta["version"] == cls.VERSION and meta["sources"] == cls._sources(log_path):
+                        levels = [{key: f[f"{k}_{key}"] for key in ('t', 'count', 'min', 'max', 'mean')}
+                                  for k in range(meta["n_levels"])]
+                        return cls(log_path, levels, meta["base_bin"])
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[WARNING] Ignoring unreadable {sidecar}: {e}")
+        if not build:
+            return None
+        return cls.build(log_path, base_bin)
+
+    @classmethod
+    def build(cls, log_path, base_bin=128, chunk_bins=4096):
+        t, count, lo, hi, total = [], [], [], [], []
+        reader = StreamLogReader(log_path)
+        with reader.open() as handle:
+            n = len(handle)
+            step = base_bin * chunk_bins
+            for start in range(0, n, step):
+                rows = slice(start, min(start + step, n))
+                ts = handle.timestamps_for(rows)
+                x = handle[rows]
+                full = len(ts) // base_bin * base_bin
+                if full:
+                    bins = x[:full].reshape(-1, base_bin, x.shape[1])
+                    t.append(ts[:full:base_bin])
+                    count.append(np.full(len(bins), base_bin))
+                    lo.append(bins.min(axis=1))
+                    hi.append(bins.max(axis=1))
+                    total.append(bins.sum(axis=1, dtype=np.float64))
+                if full < len(ts):  # partial last bin
+                    t.append(ts[full:full + 1])
+                    count.append(np.array([len(ts) - full]))
+                    lo.append(x[full:].min(axis=0, keepdims=True))
+                    hi.append(x[full:].max(axis=0, keepdims=True))
+                    total.append(x[full:].sum(axis=0, keepdims=True, dtype=np.float64))
+            n_channels, dtype = handle.shape[1], handle.dtype
+
+        if not t:
+            level = {'t': np.empty(0), 'count': np.empty(0, dtype=np.int64),
+                     'min': np.empty((0, n_channels), dtype=dtype), 'max': np.empty((0, n_channels), dtype=dtype),
+                     'sum': np.empty((0, n_channels))}
+        else:
+            level = {'t': np.concatenate(t), 'count': np.concatenate(count).astype(np.int64),
+                     'min': np.concatenate(lo), 'max': np.concatenate(hi), 'sum': np.concatenate(total)}
+        levels = [level]
+        while len(levels[-1]['t']) > 1:
+            levels.append(cls._halve(levels[-1]))
+        for level in levels:
+            level['mean'] = (level.pop('sum') / np.maximum(level['count'], 1)[:, None]).astype(np.float32)
+
+        arrays = {f"{k}_{key}": value for k, level in enumerate(levels) for key, value in level.items()}
+        meta = {"version": cls.VERSION, "base_bin": base_bin, "n_levels": len(levels),
+                "sources": cls._sources(log_path)}
+        sidecar = cls.sidecar_path(log_path)
+        try:
+            with open(sidecar + '.tmp', 'wb') as f:
+                np.savez(f, meta=json.dumps(meta), **arrays)
+            os.replace(sidecar + '.tmp', sidecar)
+        except OSError as e:
+            # Read-only or full folder: the pyramid is still usable, just rebuilt next time
+            print(f"[WARNING] Could not save {sidecar}: {e}")
+            try:
+                os.remove(sidecar + '.tmp')
+            except OSError:
+                pass
+        return cls(log_path, levels, base_bin)
+
+    def query(self, t0, t1, width, channels=None):
+        # channels: index, list of indices or None for all. About `width` points (at most 2 * width) covering [t0, t1], from the finest level that
+        # fits; below that many samples, the raw data (with min == max == mean).
+        for k, level in enumerate(self.levels):
+            # Bins overlapping [t0, t1]: the one containing t0 through the last starting before t1
+            i0 = max(int(np.searchsorted(level['t'], t0, side='right')) - 1, 0)
+            i1 = int(np.searchsorted(level['t'], t1, side='right'))
+            n_bins = i1 - i0
+            if k == 0 and n_bins * self.base_bin <= 2 * width:
+                return self._raw(t0, t1, channels)
+            if n_bins <= 2 * width or k == len(self.levels) - 1:
+                columns = slice(None) if channels is None else channels
+                return {
+                    "level": k,
+                    "bin_samples": self.base_bin * 2 ** k,
+                    "t": level['t'][i0:i1],
+                    "min": level['min'][i0:i1, columns],
+                    "max": level['max'][i0:i1, columns],
+                    "mean": level['mean'][i0:i1, columns],
+                }
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def _raw(self, t0, t1, channels):
+        if self._handle is None:
+            self._handle = StreamLogReader(self.log_path).open()
+        rows = self._handle.time_slice(t0, t1)
+        x = self._handle[rows] if channels is None else self._handle[rows, channels]
+        return {"level": None, "bin_samples": 1, "t": self._handle.timestamps_for(rows),
+                "min": x, "max": x, "mean": x}
+
+    @staticmethod
+    def _halve(level):
+        # Merge neighbouring bins pairwise; an odd last bin is carried up on its own
+        n = len(level['t'])
+        even = n - n % 2
+        merged = {
+            't': level['t'][0::2],
+            'count': level['count'][0:even:2] + level['count'][1:even:2],
+            'min': np.minimum(level['min'][0:even:2], level['min'][1:even:2]),
+            'max': np.maximum(level['max'][0:even:2], level['max'][1:even:2]),
+            'sum': level['sum'][0:even:2] + level['sum'][1:even:2],
+        }
+        if n % 2:
+            for key in ('count', 'min', 'max', 'sum'):
+                merged[key] = np.concatenate((merged[key], level[key][-1:]))
+        return merged
+
+    @classmethod
+    def sidecar_path(cls, log_path):
+        if log_path.endswith(SESSION_SUFFIX):
+            return log_path[:-len(SESSION_SUFFIX)] + cls.SUFFIX
+        return log_path + cls.SUFFIX
+
+    @staticmethod
+    def _sources(log_path):
+        reader = StreamLogReader(log_path)
+        paths = reader.segment_paths() + ([log_path] if reader.manifest else [])
+        return [[os.path.basename(p), os.path.getsize(p), os.stat(p).st_mtime_ns] for p in paths]
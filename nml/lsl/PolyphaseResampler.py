@@ -0,0 +1,119 @@
+from fractions import Fraction
+import numpy as np
+from scipy.signal import firwin
+
+
+class PolyphaseResampler:
+    """Streaming rational resampler giving the same output as scipy.signal.resample_poly.
+
+    It uses the same Kaiser-windowed anti-aliasing FIR filter and the same zero-padded edges.
+    Feed consecutive (timestamps, data) chunks to push() and call flush() once at the end;
+    only about one filter length of input is kept between calls. Output timestamps are
+    interpolated from the input timestamps at each output sample's position.
+    """
+
+    MAX_DENOMINATOR = 1000
+
+    def __init__(self, up, down, window=('kaiser', 5.0)):
+        if up < 1 or down < 1:
+            raise ValueError(f"up and down must be positive integers, got {up} and {down}")
+        g = np.gcd(up, down)
+        self.up, self.down = up // g, down // g
+        self.passthrough = self.up == self.down == 1  # resample_poly returns the input unfiltered
+        max_rate = max(self.up, self.down)
+        self.half_len = 0 if self.passthrough else 10 * max_rate
+        if self.passthrough:
+            self.n_taps, self.taps = 0, None
+        else:
+            h = firwin(2 * self.half_len + 1, 1.0 / max_rate, window=window) * self.up
+            # Polyphase taps: output i uses phase (i * down + half_len) % up, tap k pairs with input p_hi - k
+            self.n_taps = -(-len(h) // self.up)
+            h = np.concatenate((h, np.zeros(self.n_taps * self.up - len(h))))
+            self.taps = h.reshape(self.n_taps, self.up).T
+
+        self._x = None          # buffered input, starting at input index self._start
+        self._ts = np.empty(0)  # buffered timestamps (real samples only), from self._ts_start
+        self._start = -self.n_taps
+        self._ts_start = 0
+        self._n_in = 0          # input samples pushed so far
+        self._i = 0             # next output index
+        self._dt = None
+
+    @classmethod
+    def from_rates(cls, srate, target_rate=None, decimate=None):
+        if (target_rate is None) == (decimate is None):
+            raise ValueError("Give exactly one of target_rate or decimate.")
+        if srate <= 0:
+            raise ValueError("Resampling needs a stream with a nominal sampling rate.")
+        if decimate is not None:
+            return cls(1, int(decimate))
+        if target_rate <= 0:
+            raise ValueError(f"target_rate must be positive, got {target_rate}")
+        ratio = Fraction(target_rate / srate).limit_denominator(cls.MAX_DENOMINATOR)
+        return cls(ratio.numerator, ratio.denominator)
+
+    @property
+    def rate_ratio(self):
+        return self.up / self.down
+
+    def push(self, timestamps, data):
+        data = np.asarray(data)
+        if data.ndim == 1:
+            data = data[:, None]
+        if self._x is None:
+            # Zero history stands in for the samples before the first one
+            self._x = np.zeros((self.n_taps, data.shape[1]))
+            self._dtype = np.float32 if data.dtype == np.float32 else np.float64
+        if self.passthrough:
+            self._n_in += len(data)
+            self._i = self._n_in
+            return np.asarray(timestamps, dtype=np.float64), data.astype(self._dtype)
+        self._x = np.concatenate((self._x, data))
+        self._ts = np.concatenate((self._ts, timestamps))
+        self._n_in += len(data)
+        if len(self._ts) > 1:
+            self._dt = (self._ts[-1] - self._ts[0]) / (len(self._ts) - 1)
+        # Outputs whose newest input sample p_hi has arrived
+        i_end = (self._n_in * self.up - 1 - self.half_len) // self.down + 1
+        return self._emit(max(self._i, i_end))
+
+    def flush(self):
+        # Pad the end with zeros, as resample_poly does, and emit the remaining outputs
+        if self._x is None:
+            return np.empty(0), np.empty((0, 0))
+        if self.passthrough:
+            return np.empty(0), np.empty((0, self._x.shape[1]), dtype=self._dtype)
+        self._x = np.concatenate((self._x, np.zeros((self.n_taps + self.up, self._x.shape[1]))))
+        n_out = -(-self._n_in * self.up // self.down)
+        return self._emit(n_out)
+
+    def _emit(self, i_end):
+        i = np.arange(self._i, i_end)
+        y = np.zeros((len(i), self._x.shape[1]))
+        if len(i):
+            pos = i * self.down + self.half_len
+            phase, p_hi = pos % self.up, pos // self.up
+            rel = p_hi - self._start
+            for k in range(self.n_taps):
+                y += self.taps[phase, k][:, None] * self._x[rel - k]
+        t = self._timestamps(i * self.down / self.up)
+        self._i = i_end
+
+        # Keep only the inputs the next outputs can still reach
+        p_lo = (self._i * self.down + self.half_len) // self.up - self.n_taps + 1
+        drop = max(0, min(p_lo - self._start, len(self._x) - self.n_taps))
+        self._x = self._x[drop:]
+        self._start += drop
+        ts_drop = max(0, min(int(np.floor(self._i * self.down / self.up)) - self._ts_start, len(self._ts) - 2))
+        self._ts = self._ts[ts_drop:]
+        self._ts_start += ts_drop
+        return t, y.astype(self._dtype)
+
+    def _timestamps(self, positions):
+        # Linear interpolation between input timestamps, extrapolated past the last one
+        idx = np.arange(self._ts_start, self._ts_start + len(self._ts))
+        t = np.interp(positions, idx, self._ts)
+        if len(self._ts) and self._dt is not None:
+            past = positions > idx[-1]
+            t[past] = self._ts[-1] + (positions[past] - idx[-1]) * self._dt
+        return t
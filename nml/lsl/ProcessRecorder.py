@@ -0,0 +1,102 @@
+import multiprocessing
+from pylsl import StreamInfo, StreamInlet, resolve_bypred
+
+
+def _record_stream(query, output_path, logger_kwargs, conn, stop_event, report_interval):
+    # Runs in the worker process: its own interpreter, GIL and LSL inlet
+    from nml.lsl.BinaryStreamLogger import BinaryStreamLogger
+    from nml.lsl.StreamRecorder import StreamRecorder
+
+    logger = recorder = None
+    stopped = False
+    try:
+        streams = resolve_bypred(f"uid='{query['uid']}'", timeout=5.0)
+        if not streams:
+            raise RuntimeError(f"Stream {query['name']} ({query['uid']}) is no longer available")
+        logger = BinaryStreamLogger(StreamInlet(streams[0]), output_path, **logger_kwargs)
+        recorder = StreamRecorder(logger)
+        recorder.start()
+        conn.send(dict(recorder.stats(), status="running"))
+        while not stop_event.wait(report_interval):
+            if recorder.error is not None:
+                # The acquisition or writer thread gave up
+                raise RuntimeError(str(recorder.error))
+            conn.send(dict(recorder.stats(), status="running"))
+        recorder.stop()
+        stopped = True
+        conn.send(dict(recorder.stats(), status="stopped"))
+    except Exception as e:
+        stats = recorder.stats() if recorder is not None else {}
+        conn.send(dict(stats, status="failed", error=str(e)))
+    finally:
+        # Whatever failed, join the threads and close the file (running is already False after a writer error)
+        try:
+            if recorder is not None and not stopped:
+                recorder.stop()
+            elif recorder is None and logger is not None:
+                logger.close()
+        except Exception as e:
+            print(f"[ERROR] Failed to close {output_path}: {e}")
+        conn.close()
+
+
+class ProcessRecorder:
+    """Records one stream with a StreamRecorder in a separate process.
+
+    Health and counters come back over a pipe; stats() returns the latest report.
+    """
+
+    def __init__(self, info: StreamInfo, output_path: str, report_interval: float = 0.5, **logger_kwargs):
+        self.output_path = output_path
+        self.query = {"uid": info.uid(), "name": info.name()}
+        # spawn: no forked copies of the Qt application or of open LSL handles
+        ctx = multiprocessing.get_context('spawn')
+        self._conn, child_conn = ctx.Pipe(duplex=False)
+        self._stop_event = ctx.Event()
+        self.process = ctx.Process(
+            target=_record_stream,
+            args=(self.query, output_path, logger_kwargs, child_conn, self._stop_event, report_interval),
+            daemon=True,
+        )
+        self._stats = {
+            "stream_name": info.name(),
+            "status": "starting",
+            "queue_depth": 0,
+            "queue_capacity": 0,
+            "high_water": 0,
+            "overflows": 0,
+            "samples_written": 0,
+            "chunks_written": 0,
+            "error": None,
+        }
+
+    def start(self):
+        self.process.start()
+
+    def stop(self, timeout=10.0):
+        self._stop_event.set()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+            self._stats["error"] = "Worker did not stop in time and was terminated"
+        self._poll()
+
+    @property
+    def running(self):
+        return self.process.is_alive()
+
+    def stats(self):
+        self._poll()
+        return dict(self._stats, alive=self.process.is_alive(), pid=self.process.pid)
+
+    def _poll(self):
+        try:
+            while self._conn.poll():
+                self._stats.update(self._conn.recv())
+        except (EOFError, OSError):
+            pass  # worker exited and closed its end
+        if not self.process.is_alive() and self._stats["status"] in ("starting", "running"):
+            if self.process.exitcode not in (None, 0):
+                self._stats["status"] = "failed"
+                self._stats["error"] = self._stats["error"] or f"Worker exited with code {self.process.exitcode}"
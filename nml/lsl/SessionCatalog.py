@@ -0,0 +1,256 @@
+import os
+import csv
+import json
+import sqlite3
+from nml.lsl.StreamLogReader import StreamLogReader
+from nml.lsl.LogFormat import SESSION_SUFFIX
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS streams (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    name TEXT NOT NULL,            -- file name; the stream key is its 'YYYYMMDD_HHMMSS' prefix
+    signature TEXT NOT NULL,       -- sizes and mtimes of the file (and its segments)
+    is_session INTEGER NOT NULL,
+    segments TEXT,                 -- json list of segment file names, for sessions
+    stream_name TEXT,
+    sampling_rate REAL,
+    n_channels INTEGER,
+    format TEXT,
+    channel_names TEXT,            -- json list
+    n_samples INTEGER,
+    duration REAL,
+    t_start REAL,
+    t_end REAL,
+    error TEXT                     -- set instead of the fields above when the header is unreadable
+);
+CREATE INDEX IF NOT EXISTS streams_name ON streams (folder, name);
+CREATE INDEX IF NOT EXISTS streams_time ON streams (folder, t_start, t_end);
+
+CREATE TABLE IF NOT EXISTS metadata_files (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    key TEXT NOT NULL,             -- 'YYYYMMDD_HHMMSS'
+    suffix TEXT NOT NULL,
+    kind TEXT NOT NULL,            -- state, parameter, filename, trials
+    signature TEXT NOT NULL,
+    t_first REAL,
+    t_last REAL
+);
+CREATE INDEX IF NOT EXISTS metadata_suffix ON metadata_files (folder, suffix, key);
+CREATE INDEX IF NOT EXISTS metadata_time ON metadata_files (folder, t_first, t_last);
+"""
+
+
+class SessionCatalog:
+    """SQLite catalog of the stream logs and metadata sessions in a set of folders.
+
+    refresh_streams() / refresh_metadata() stat every file in a folder but re-read only the
+    ones whose size or mtime changed since the last refresh, so listing a folder, finding a
+    stream by key or finding the metadata sessions that overlap a recording are indexed
+    queries instead of directory walks and header reads.
+    """
+
+    CATALOG_VERSION = 1
+    TAIL_BYTES = 64 * 1024
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(os.path.expanduser('~'), '.cache', 'nml_lsl', 'catalog.sqlite')
+        if self.db_path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, timeout=10)
+        self.conn.row_factory = sqlite3.Row
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != self.CATALOG_VERSION:
+            self.conn.executescript("DROP TABLE IF EXISTS streams; DROP TABLE IF EXISTS metadata_files;")
+            self.conn.execute(f"PRAGMA user_version = {self.CATALOG_VERSION}")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # === Refresh ===
+
+    def refresh_streams(self, folder):
+        # Re-reads the headers of new or changed logs only; drops rows for removed files
+        folder = os.path.abspath(folder)
+        stats = self._stat_folder(folder)
+        known = {row['path']: row['signature'] for row in
+                 self.conn.execute("SELECT path, signature FROM streams WHERE folder = ?", (folder,))}
+
+        # Rotated recordings are listed once, by their manifest; their segments are not
+        entries, segment_names = {}, set()
+        for name in stats:
+            if name.endswith(SESSION_SUFFIX):
+                path = os.path.join(folder, name)
+                try:
+                    segments = [os.path.basename(p) for p in StreamLogReader(path).segment_paths()]
+                except Exception as e:
+                    print(f"[WARNING] Failed to read session manifest {name}: {e}")
+                    continue
+                segment_names.update(segments)
+                signature = json.dumps([stats[name]] + [stats.get(s) for s in segments])
+                entries[path] = (name, signature, segments)
+        for name in stats:
+            if name.endswith('.bin') and name not in segment_names:
+                entries[os.path.join(folder, name)] = (name, json.dumps(stats[name]), None)
+
+        with self.conn:
+            for path in set(known) - set(entries):
+                self.conn.execute("DELETE FROM streams WHERE path = ?", (path,))
+            for path, (name, signature, segments) in entries.items():
+                if known.get(path) != signature:
+                    self.conn.execute("INSERT OR REPLACE INTO streams VALUES "
+                                      "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                      self._describe_stream(path, folder, name, signature, segments))
+
+    def refresh_metadata(self, folder):
+        folder = os.path.abspath(folder)
+        stats = self._stat_folder(folder)
+        known = {row['path']: row['signature'] for row in
+                 self.conn.execute("SELECT path, signature FROM metadata_files WHERE folder = ?", (folder,))}
+        entries = {}
+        for name in stats:
+            parsed = self._parse_metadata_name(name)
+            if parsed is not None:
+                entries[os.path.join(folder, name)] = parsed + (json.dumps(stats[name]),)
+
+        with self.conn:
+            for path in set(known) - set(entries):
+                self.conn.execute("DELETE FROM metadata_files WHERE path = ?", (path,))
+            for path, (key, suffix, kind, signature) in entries.items():
+                if known.get(path) != signature:
+                    t_first, t_last = self._csv_time_range(path)
+                    self.conn.execute("INSERT OR REPLACE INTO metadata_files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                      (path, folder, key, suffix, kind, signature, t_first, t_last))
+
+    # === Queries ===
+
+    def streams(self, folder, key=None):
+        # Logs in a folder (sessions first for each name), optionally those whose file name starts with key
+        folder = os.path.abspath(folder)
+        query = "SELECT * FROM streams WHERE folder = ?"
+        args = [folder]
+        if key is not None:
+            # Prefix match as a range over the (folder, name) index
+            query += " AND name >= ? AND name < ?"
+            args += [key, key + '\U0010ffff']
+        rows = self.conn.execute(query + " ORDER BY is_session DESC, name", args).fetchall()
+        return [self._stream_row(row) for row in rows]
+
+    def find_stream(self, folder, key):
+        # Path of the log for a stream key (a session manifest before a plain .bin), or None
+        rows = self.streams(folder, key)
+        return rows[0]["path"] if rows else None
+
+    def metadata_sessions(self, folder, suffix=None, t0=None, t1=None):
+        # Metadata sessions (one per key and suffix) with the kinds of CSV they have and the
+        # time span of their events; with t0/t1, only those overlapping [t0, t1]
+        folder = os.path.abspath(folder)
+        query = ("SELECT key, suffix, group_concat(kind) AS kinds, min(t_first) AS t_first, max(t_last) AS t_last "
+                 "FROM metadata_files WHERE folder = ?")
+        args = [folder]
+        if suffix is not None:
+            query += " AND suffix = ?"
+            args.append(suffix)
+        query += " GROUP BY key, suffix HAVING 1"
+        if t1 is not None:
+            query += " AND min(t_first) <= ?"
+            args.append(t1)
+        if t0 is not None:
+            query += " AND max(t_last) >= ?"
+            args.append(t0)
+        query += " ORDER BY key, suffix"
+        return [dict(row, kinds=sorted(row['kinds'].split(','))) for row in self.conn.execute(query, args)]
+
+    def first_metadata_key(self, folder, suffix):
+        # Earliest session key with this suffix (keys sort as YYYYMMDD_HHMMSS), or None
+        row = self.conn.execute("SELECT min(key) FROM metadata_files WHERE folder = ? AND suffix = ?",
+                                (os.path.abspath(folder), suffix)).fetchone()
+        return row[0]
+
+    def sessions_for_stream(self, stream_folder, key, metadata_folder, suffix=None):
+        # Metadata sessions whose events fall within the recording of a stream key
+        rows = [row for row in self.streams(stream_folder, key) if row["t_start"] is not None]
+        if not rows:
+            return []
+        return self.metadata_sessions(metadata_folder, suffix, rows[0]["t_start"], rows[0]["t_end"])
+
+    # === Helpers ===
+
+    @staticmethod
+    def _stat_folder(folder):
+        # file name -> [size, mtime_ns]
+        if not os.path.isdir(folder):
+            return {}
+        with os.scandir(folder) as it:
+            return {entry.name: [entry.stat().st_size, entry.stat().st_mtime_ns] for entry in it if entry.is_file()}
+
+    @staticmethod
+    def _describe_stream(path, folder, name, signature, segments):
+        row = [path, folder, name, signature, int(segments is not None),
+               json.dumps(segments) if segments is not None else None]
+        try:
+            reader = StreamLogReader(path)
+            header = reader.read_header()
+            with reader.open() as handle:
+                # Exact count and first/last timestamps from the index (v2) or the mapped records (v1)
+                n_samples = len(handle)
+                t_start = float(handle.timestamps_for(slice(0, 1))[0]) if n_samples else None
+                t_end = float(handle.timestamps_for(slice(n_samples - 1, n_samples))[0]) if n_samples else None
+        except Exception as e:
+            return row + [None] * 9 + [str(e)]
+        return row + [header["stream_name"], header["sampling_rate"], header["n_channels"], header["format"],
+                      json.dumps(header["channel_names"]), n_samples,
+                      n_samples / header["sampling_rate"] if header["sampling_rate"] > 0 else None,
+                      t_start, t_end, None]
+
+    @staticmethod
+    def _stream_row(row):
+        row = dict(row)
+        row["channel_names"] = json.loads(row["channel_names"]) if row["channel_names"] else None
+        row["segments"] = json.loads(row["segments"]) if row["segments"] else None
+        row["is_session"] = bool(row["is_session"])
+        del row["signature"]
+        return row
+
+    @staticmethod
+    def _parse_metadata_name(name):
+        # logger_YYYYMMDD_HHMMSS_SUFFIX_kind.csv -> (key, suffix, kind)
+        if not name.startswith("logger_") or not name.endswith(".csv"):
+            return None
+        parts = name[:-len(".csv")].split("_")
+        if len(parts) < 5:
+            return None
+        return f"{parts[1]}_{parts[2]}", "_".join(parts[3:-1]), parts[-1]
+
+    @classmethod
+    def _csv_time_range(cls, path):
+        # LSL timestamps (first column) of the first and last rows, reading only the file's ends
+        try:
+            with open(path, 'rb') as f:
+                f.readline()  # column names
+                first = cls._first_float(f.readline().decode('utf-8', 'replace'))
+                size = os.fstat(f.fileno()).st_size
+                f.seek(max(0, size - cls.TAIL_BYTES))
+                lines = f.read().decode('utf-8', 'replace').splitlines()
+        except OSError:
+            return None, None
+        for line in reversed(lines):
+            last = cls._first_float(line)
+            if last is not None:
+                return first, last
+        return first, first
+
+    @staticmethod
+    def _first_float(line):
+        try:
+            return float(next(csv.reader([line]))[0])
+        except (StopIteration, IndexError, ValueError):
+            return None
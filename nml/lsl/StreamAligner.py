@@ -0,0 +1,201 @@
+import numpy as np
+import pandas as pd
+from nml.lsl.StreamLogReader import StreamLogReader
+
+
+class StreamAligner:
+    """Puts several stream logs (and marker tables) on one clock and one sample grid.
+
+    Each stream's timestamps are mapped to the recording machine's clock with a linear
+    clock model, offset + drift * t. The model is fit to the time_correction() samples
+    stored by timebase logs, or taken from a given constant offset. The streams are then
+    interpolated onto a common grid chunk_samples grid points at a time, so only one chunk
+    of each source is read at once.
+    """
+
+    OUTLIER_MADS = 5.0       # time_correction() samples further than this from the fit are dropped
+    RATE_PROBES = 256        # samples used to measure a stream's effective rate
+    MIN_DRIFT_SPAN = 1.0     # seconds of corrections needed before drift is estimated
+
+    def __init__(self, rate=None, t0=None, t1=None, chunk_samples=65536):
+        self.rate = rate              # common rate (Hz); default: the highest nominal rate
+        self.t0 = t0                  # common span on the aligned clock; default: where all streams overlap
+        self.t1 = t1
+        self.chunk_samples = chunk_samples
+        self.streams = []
+        self.events = {}
+
+    def add_stream(self, path, channels=None, name=None, offset=None, method='linear'):
+        # offset: constant clock offset (s) to use instead of the recorded corrections.
+        # method: 'linear', or 'nearest' for counters and other step-like channels
+        if method not in ('linear', 'nearest'):
+            raise ValueError(f"Unknown interpolation method: {method}")
+        reader = StreamLogReader(path)
+        handle = reader.open()
+        if handle.sampling_rate <= 0 and self.rate is None:
+            print(f"[WARNING] {handle.stream_name} has no nominal rate; give StreamAligner(rate=...).")
+        if offset is None:
+            model = self.fit_clock(reader.read_time_corrections())
+        else:
+            model = {"offset": float(offset), "drift": 0.0, "n_corrections": 0, "residual": None}
+        model["effective_rate"] = self._effective_rate(handle)
+        self.streams.append({
+            "name": name or handle.stream_name,
+            "handle": handle,
+            "columns": handle.channel_indices(channels) if channels is not None else list(range(handle.shape[1])),
+            "model": model,
+            "method": method,
+        })
+        return model
+
+    def add_events(self, name, table, time_column='Timestamp', offset=0.0, drift=0.0):
+        # Marker tables (ParameterLogger CSVs or DataFrames) carried onto the aligned clock
+        if isinstance(table, str):
+            table = pd.read_csv(table)
+        self.events[name] = (table, time_column, {"offset": offset, "drift": drift})
+
+    @classmethod
+    def fit_clock(cls, corrections):
+        # Least-squares offset + drift * remote_time over the (local_time, offset) samples,
+        # refit once without outliers (time_correction() has occasional slow round trips)
+        if len(corrections) == 0:
+            return {"offset": 0.0, "drift": 0.0, "n_corrections": 0, "residual": None}
+        offsets = corrections['offset'].astype(np.float64)
+        remote = corrections['local_time'] - offsets
+        if len(corrections) < 3 or np.ptp(remote) < cls.MIN_DRIFT_SPAN:
+            return {"offset": float(np.median(offsets)), "drift": 0.0,
+                    "n_corrections": len(corrections), "residual": None}
+        keep = np.ones(len(offsets), dtype=bool)
+        for _ in range(2):
+            drift, offset = np.polyfit(remote[keep], offsets[keep], 1)
+            residual = offsets - (offset + drift * remote)
+            mad = np.median(np.abs(residual[keep] - np.median(residual[keep])))
+            keep = np.abs(residual) <= max(cls.OUTLIER_MADS * 1.4826 * mad, 1e-9)
+        return {"offset": float(offset), "drift": float(drift), "n_corrections": len(corrections),
+                "residual": float(np.std(residual[keep]))}
+
+    def clock_models(self):
+        return {s["name"]: s["model"] for s in self.streams}
+
+    def grid(self):
+        # Common timestamps on the aligned clock
+        if not self.streams:
+            raise ValueError("Add at least one stream before aligning.")
+        spans = np.array([self._aligned_span(s) for s in self.streams])
+        t0 = spans[:, 0].max() if self.t0 is None else self.t0
+        t1 = spans[:, 1].min() if self.t1 is None else self.t1
+        rate = self.rate or max(s["handle"].sampling_rate for s in self.streams)
+        if rate <= 0:
+            raise ValueError("No common rate: give StreamAligner(rate=...).")
+        if t1 < t0:
+            raise ValueError(f"The streams do not overlap ({t0:.3f} > {t1:.3f}); give t0/t1.")
+        return t0 + np.arange(int(np.floor((t1 - t0) * rate)) + 1) / rate
+
+    def iter_align(self):
+        # Yield (t, data [n, total_channels]) one grid chunk at a time; NaN outside a stream's span
+        t = self.grid()
+        dtype = np.result_type(np.float32, *[s["handle"].dtype for s in self.streams])
+        n_columns = sum(len(s["columns"]) for s in self.streams)
+        for start in range(0, len(t), self.chunk_samples):
+            t_chunk = t[start:start + self.chunk_samples]
+            out = np.empty((len(t_chunk), n_columns), dtype=dtype)
+            col = 0
+            for stream in self.streams:
+                n = len(stream["columns"])
+                out[:, col:col + n] = self._interpolate(stream, t_chunk)
+                col += n
+            yield t_chunk, out
+
+    def align(self, out=None):
+        # -> {'t', 'data' [n_samples, total_channels], 'channel_names', 'streams': {name: column slice},
+        #     'clock_models', 'events': {name: table with aligned_time and sample}}
+        # out: optional preallocated array (e.g. np.lib.format.open_memmap) for results larger than RAM
+        t = self.grid()
+        data = out
+        start = 0
+        for t_chunk, chunk in self.iter_align():
+            if data is None:
+                data = np.empty((len(t), chunk.shape[1]), dtype=chunk.dtype)
+            data[start:start + len(t_chunk)] = chunk
+            start += len(t_chunk)
+
+        columns, channel_names, col = {}, [], 0
+        for stream in self.streams:
+            names = stream["handle"].channel_names
+            channel_names += [f"{stream['name']}:{names[c]}" for c in stream["columns"]]
+            columns[stream["name"]] = slice(col, col + len(stream["columns"]))
+            col += len(stream["columns"])
+
+        events = {}
+        for name, (table, time_column, model) in self.events.items():
+            aligned = self._to_aligned(table[time_column].to_numpy(dtype=np.float64), model)
+            # Nearest grid sample, or -1 outside the grid
+            hi = np.clip(np.searchsorted(t, aligned), 1, max(len(t) - 1, 1))
+            sample = np.where(np.abs(aligned - t[hi - 1]) <= np.abs(t[np.minimum(hi, len(t) - 1)] - aligned), hi - 1, hi)
+            sample = np.where((aligned >= t[0]) & (aligned <= t[-1]), sample, -1)
+            events[name] = table.assign(aligned_time=aligned, sample=sample)
+
+        return {"t": t, "data": data, "channel_names": channel_names, "streams": columns,
+                "clock_models": self.clock_models(), "events": events}
+
+    def close(self):
+        for stream in self.streams:
+            stream["handle"].close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def _to_aligned(ts, model):
+        return ts + model["offset"] + model["drift"] * ts
+
+    @staticmethod
+    def _to_remote(t, model):
+        return (t - model["offset"]) / (1.0 + model["drift"])
+
+    def _aligned_span(self, stream):
+        handle = stream["handle"]
+        n = len(handle)
+        if n == 0:
+            return np.inf, -np.inf
+        ends = handle.timestamps_for(np.array([0, n - 1]))
+        return self._to_aligned(ends, stream["model"])
+
+    def _effective_rate(self, handle):
+        # Slope of timestamp against sample number over evenly spread samples
+        n = len(handle)
+        if n < 2:
+            return None
+        rows = np.unique(np.linspace(0, n - 1, min(n, self.RATE_PROBES)).astype(np.int64))
+        slope = np.polyfit(rows, handle.timestamps_for(rows), 1)[0]
+        return float(1.0 / slope) if slope > 0 else None
+
+    def _interpolate(self, stream, t):
+        # Source samples bracketing this chunk of the grid, then one vectorized interpolation
+        handle, model = stream["handle"], stream["model"]
+        remote = self._to_remote(t, model)
+        rows = handle.time_slice(remote[0], remote[-1])
+        rows = slice(max(rows.start - 1, 0), min(rows.stop + 1, len(handle)))
+        result = np.full((len(t), len(stream["columns"])), np.nan)
+        if rows.stop - rows.start == 0:
+            return result
+        ts = self._to_aligned(handle.timestamps_for(rows), model)
+        x = handle[rows, stream["columns"]]
+
+        inside = (t >= ts[0]) & (t <= ts[-1])
+        if not inside.any():
+            return result
+        ti = t[inside]
+        hi = np.clip(np.searchsorted(ts, ti, side='left'), 1, len(ts) - 1) if len(ts) > 1 else np.zeros(len(ti), dtype=np.int64)
+        lo = np.maximum(hi - 1, 0)
+        dt = ts[hi] - ts[lo]
+        w = np.divide(ti - ts[lo], dt, out=np.zeros_like(ti), where=dt > 0)
+        if stream["method"] == 'nearest':
+            result[inside] = np.where((w < 0.5)[:, None], x[lo], x[hi])
+        else:
+            w = w[:, None]
+            result[inside] = x[lo] * (1.0 - w) + x[hi] * w
+        return result
@@ -0,0 +1,118 @@
+import os
+import numpy as np
+
+
+class StreamLogFollower:
+    """Incremental reader for a log that is still being written, from StreamLogReader.follow().
+
+    Each poll() parses only what was appended since the previous one and returns the new
+    complete records (version 1) or blocks (version 2); a partially written record or block
+    is left for a later poll. Rotated sessions move on to the next segment once the current
+    one has been closed. With `seconds`, the first poll starts that far before the end of what
+    has been written (in the newest segment of a session) rather than at the beginning.
+    """
+
+    def __init__(self, reader, seconds=None):
+        self.reader = reader
+        self.seconds = seconds
+        self.header = None
+        self.finished = False  # set once the logger has closed the (last) file
+        self._segment = 0
+        self._file = None
+        self._offset = None
+
+    @property
+    def channel_names(self):
+        return self.header["metadata"].get("channel_names") if self.header else None
+
+    def poll(self):
+        timestamps, data = [], []
+        while not self.finished:
+            if self._file is None and not self._open_segment():
+                break
+            if self.header["version"] == 1:
+                self._read_records(timestamps, data)
+                break
+            self._read_blocks(timestamps, data)
+            if not self._segment_closed() or not self._next_segment():
+                break
+
+        if not timestamps:
+            n_channels = self.header["n_channels"] if self.header else 0
+            dtype = self.header["dtype"] if self.header else np.float32
+            return np.empty(0), np.empty((0, n_channels), dtype=dtype)
+        return np.concatenate(timestamps), np.concatenate(data)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _paths(self):
+        self.reader.reload_manifest()
+        return self.reader.segment_paths()
+
+    def _open_segment(self):
+        paths = self._paths()
+        if self.seconds is not None and self.header is None:
+            self._segment = max(len(paths) - 1, 0)
+        if self._segment >= len(paths) or not os.path.exists(paths[self._segment]):
+            return False
+        f = open(paths[self._segment], 'rb')
+        header = self.reader.read_file_header(f)
+        if header is None:
+            f.close()  # header not completely written yet
+            return False
+        self.header = self.header or header
+        self._segment_header = header
+        self._file = f
+        self._offset = header["data_offset"]
+        if self.seconds is not None:
+            self._offset = self.reader.tail_offset(f, header, self.seconds)
+            self.seconds = None
+        return True
+
+    def _size(self):
+        return os.fstat(self._file.fileno()).st_size
+
+    def _read_records(self, timestamps, data):
+        rec_dtype = self.header["record_dtype"]
+        n = (self._size() - self._offset) // rec_dtype.itemsize
+        if n <= 0:
+            return
+        records = np.empty(n, dtype=rec_dtype)
+        self._file.seek(self._offset)
+        n = self._file.readinto(records.view(np.uint8)) // rec_dtype.itemsize
+        self._offset += n * rec_dtype.itemsize
+        timestamps.append(records['ts'][:n])
+        data.append(records['x'][:n])
+
+    def _read_blocks(self, timestamps, data):
+        for end, ts, x in self.reader.tail_blocks(self._file, self._segment_header, self._offset):
+            timestamps.append(ts)
+            data.append(x)
+            self._offset = end
+
+    def _segment_closed(self):
+        # Closed, and every block before the footer has been read (the logger may have written
+        # a last block and the footer since _read_blocks looked)
+        return self.reader.footer_offset(self._file, self._segment_header) == self._offset
+
+    def _next_segment(self):
+        # Closed segment: continue with the next one, or stop if the session is complete
+        self.close()
+        self._segment += 1
+        if self.reader.manifest is None:
+            self.finished = True
+            return False
+        n_segments = len(self._paths())
+        if self.reader.manifest.get("complete") and self._segment >= n_segments:
+            self.finished = True
+            return False
+        return True
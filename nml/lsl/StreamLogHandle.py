@@ -0,0 +1,349 @@
+import os
+import re
+from fnmatch import fnmatchcase
+from collections import OrderedDict
+import numpy as np
+from numpy.lib.mixins import NDArrayOperatorsMixin
+from nml.lsl.LogFormat import BLOCK_HEADER
+
+
+def resolve_channels(channel_names, channels):
+    # Channel selector -> column index (int) or list of indices. A selector is an index,
+    # a label, a regex or glob over the labels (e.g. 'UNI.*' or 'UNI*'), a slice, or a list of these.
+    if channels is None:
+        return list(range(len(channel_names)))
+    if isinstance(channels, (int, np.integer)):
+        return _channel_index(channels, len(channel_names))
+    if isinstance(channels, slice):
+        return list(range(len(channel_names)))[channels]
+    if isinstance(channels, (str, re.Pattern)):
+        channels = [channels]
+    indices = []
+    for selector in channels:
+        if isinstance(selector, (int, np.integer)):
+            matches = [_channel_index(selector, len(channel_names))]
+        elif isinstance(selector, str) and selector in channel_names:
+            matches = [channel_names.index(selector)]
+        elif isinstance(selector, str):
+            # Regex first; globs such as '*01' are not valid regexes, so fall back to fnmatch
+            try:
+                pattern = re.compile(selector)
+                matches = [i for i, name in enumerate(channel_names) if pattern.fullmatch(name)]
+            except re.error:
+                matches = []
+            if not matches:
+                matches = [i for i, name in enumerate(channel_names) if fnmatchcase(name, selector)]
+        else:
+            matches = [i for i, name in enumerate(channel_names) if selector.fullmatch(name)]
+        if not matches:
+            raise ValueError(f"No channel matches {selector!r}")
+        indices.extend(i for i in matches if i not in indices)
+    return indices
+
+
+def _channel_index(index, n_channels):
+    index = int(index)
+    if not -n_channels <= index < n_channels:
+        raise IndexError(f"Channel {index} out of range for {n_channels} channels")
+    return index % n_channels
+
+
+class StreamLogHandle:
+    """Lazy view of a stream log, from StreamLogReader.open().
+
+    Uncompressed records are memory-mapped, so slicing only touches the pages it
+    needs; compressed or timebase blocks are decoded on demand and kept in a small
+    cache. handle[rows] or handle[rows, channels] returns a (samples, channels) array;
+    channels can be given as anything resolve_channels() accepts.
+    """
+
+    CACHED_BLOCKS = 8
+
+    def __init__(self, reader, header, index):
+        self.reader = reader
+        self.header = header
+        self.stream_name = header["stream_name"]
+        self.sampling_rate = header["sampling_rate"]
+        self.metadata = header["metadata"]
+        self.dtype = header["dtype"]
+        n_channels = header["n_channels"]
+        self.channel_names = self.metadata.get("channel_names", [f"ch{i}" for i in range(n_channels)])
+        self.units = self.metadata.get("units", ["unknown"] * n_channels)
+
+        self._raw = header["codec"] is None and not header["timebase"]
+        self._files = {}
+        self._maps = {}
+        self._cache = OrderedDict()
+        if index is None:
+            # Version 1: the whole body is one run of records
+            self._index = None
+            self._blocks = [self._map_v1()]
+            counts = [len(self._blocks[0])]
+        else:
+            self._index = index
+            self._blocks = [self._map_block(block) if self._raw else None for block in index]
+            counts = index['n_samples'].astype(np.int64)
+        self._starts = np.concatenate(([0], np.cumsum(counts, dtype=np.int64)))
+        self._timestamps = None
+
+    @property
+    def shape(self):
+        return int(self._starts[-1]), self.header["n_channels"]
+
+    def __len__(self):
+        return int(self._starts[-1])
+
+    @property
+    def timestamps(self):
+        # Version 1: a strided view into the mapped file; version 2: read once and cached
+        if self._timestamps is None:
+            if self._index is None:
+                self._timestamps = self._blocks[0]['ts']
+            else:
+                self._timestamps = self._gather('ts', slice(None), None)
+        return self._timestamps
+
+    @property
+    def data(self):
+        # (samples, channels): a mapped view for version 1. Version 2 blocks are not read here;
+        # the handle itself is returned, to be sliced with handle[rows, channels] (np.asarray reads it all)
+        if self._index is None:
+            return self._blocks[0]['x']
+        return self
+
+    @property
+    def ndim(self):
+        return 2
+
+    def mapped(self, rows=slice(None)):
+        # (samples, channels) view into the mapped file for a slice of rows that lies in one run of
+        # uncompressed records (anywhere in a version 1 log, or inside one version 2 block), else None
+        start, stop, step = rows.indices(len(self))
+        if step != 1:
+            return None
+        if self._index is None:
+            return self._blocks[0]['x'][start:stop]
+        if not self._raw or stop <= start:
+            return None
+        b = int(np.searchsorted(self._starts, start, side='right')) - 1
+        if stop > self._starts[b + 1]:
+            return None
+        return self._blocks[b]['x'][start - self._starts[b]:stop - self._starts[b]]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self[:], dtype=dtype)
+
+    def __getitem__(self, key):
+        rows, channels = key if isinstance(key, tuple) else (key, slice(None))
+        if not isinstance(channels, (slice, int, np.integer, np.ndarray)):
+            channels = self.channel_indices(channels)
+        if isinstance(rows, (int, np.integer)):
+            n = len(self)
+            if not -n <= rows < n:
+                raise IndexError(f"Sample {rows} out of range for {n} samples")
+            return self._gather('x', np.array([rows % n]), channels)[0]
+        return self._gather('x', rows, channels)
+
+    def channel_indices(self, channels=None):
+        return resolve_channels(self.channel_names, channels)
+
+    def time_slice(self, t0=None, t1=None):
+        # Sample range with t0 <= timestamp <= t1, reading only the blocks at its edges
+        start = 0 if t0 is None else self._search(t0, 'left')
+        stop = len(self) if t1 is None else self._search(t1, 'right')
+        return slice(start, max(start, stop))
+
+    def timestamps_for(self, rows):
+        return self._gather('ts', rows, None)
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+        self._maps.clear()
+        self._blocks = []
+        self._cache.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _search(self, t, side):
+        if self._index is None:
+            return int(np.searchsorted(self._blocks[0]['ts'], t, side=side))
+        # First block that can hold the boundary, then a search inside that block only
+        if side == 'left':
+            b = int(np.searchsorted(self._index['t_last'], t, side='left'))
+        else:
+            b = int(np.searchsorted(self._index['t_first'], t, side='right')) - 1
+        if b < 0:
+            return 0
+        if b >= len(self._index):
+            return len(self)
+        return int(self._starts[b]) + int(np.searchsorted(self._records(b)['ts'], t, side=side))
+
+    def _gather(self, field, rows, channels):
+        n = len(self)
+        if isinstance(rows, slice):
+            start, stop, step = rows.indices(n)
+            if step > 0:
+                return self._gather_slice(field, start, stop, step, channels)
+            rows = np.arange(start, stop, step)
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        rows = np.where(rows < 0, rows + n, rows).astype(np.int64)
+        if len(rows) and (rows.min() < 0 or rows.max() >= n):
+            raise IndexError(f"Sample index out of range for {n} samples")
+
+        blocks = np.searchsorted(self._starts, rows, side='right') - 1
+        out = None
+        for b in np.unique(blocks):
+            mask = blocks == b
+            values = self._select(self._records(b)[field][rows[mask] - self._starts[b]], field, channels)
+            if out is None:
+                out = np.empty((len(rows),) + values.shape[1:], dtype=values.dtype)
+            out[mask] = values
+        if out is None:
+            out = self._select(self._empty()[field], field, channels)
+        return out
+
+    def _gather_slice(self, field, start, stop, step, channels):
+        pieces = []
+        first = int(np.searchsorted(self._starts, start, side='right')) - 1
+        for b in range(max(first, 0), len(self._starts) - 1):
+            b_start, b_stop = int(self._starts[b]), int(self._starts[b + 1])
+            if b_start >= stop:
+                break
+            i = start if start >= b_start else start + -(-(b_start - start) // step) * step
+            if i >= min(stop, b_stop):
+                continue
+            local = slice(i - b_start, min(stop, b_stop) - b_start, step)
+            pieces.append(self._select(self._records(b)[field][local], field, channels))
+        if not pieces:
+            return self._select(self._empty()[field], field, channels)
+        return np.concatenate(pieces) if len(pieces) > 1 else np.array(pieces[0])
+
+    def _select(self, values, field, channels):
+        if field == 'ts' or channels is None:
+            return values
+        return values[:, channels]
+
+    def _empty(self):
+        return np.empty(0, dtype=self.header["record_dtype"])
+
+    def _records(self, b):
+        if self._blocks[b] is not None:
+            return self._blocks[b]
+        if b in self._cache:
+            self._cache.move_to_end(b)
+            return self._cache[b]
+        block = self._index[b]
+        records, _, _ = self.reader._read_block(self._file(int(block['segment'])), self.header, block)
+        self._cache[b] = records
+        if len(self._cache) > self.CACHED_BLOCKS:
+            self._cache.popitem(last=False)
+        return records
+
+    def _file(self, segment):
+        if segment not in self._files:
+            self._files[segment] = open(self.reader.segment_paths()[segment], 'rb')
+        return self._files[segment]
+
+    def _map(self, segment):
+        if segment not in self._maps:
+            self._maps[segment] = np.memmap(self.reader.segment_paths()[segment], dtype=np.uint8, mode='r')
+        return self._maps[segment]
+
+    def _map_block(self, block):
+        start = int(block['offset']) + BLOCK_HEADER.size
+        n_bytes = int(block['n_samples']) * self.header["record_dtype"].itemsize
+        return self._map(int(block['segment']))[start:start + n_bytes].view(self.header["record_dtype"])
+
+    def _map_v1(self):
+        rec_dtype = self.header["record_dtype"]
+        body = os.path.getsize(self.reader.path) - self.header["data_offset"]
+        n, tail = divmod(body, rec_dtype.itemsize)
+        if tail:
+            print(f"[WARNING] {self.reader.path} ends in a partial record; ignoring its last {tail} bytes.")
+        if n == 0:
+            return self._empty()
+        return np.memmap(self.reader.path, dtype=rec_dtype, mode='r', offset=self.header["data_offset"], shape=(n,))
+
+
+class SignalView(NDArrayOperatorsMixin):
+    """Channel-major [channels, samples] signal of a compressed log, read only where it is indexed.
+
+    Indexing follows NumPy (two index lists pick pairs) and decodes only the blocks it reaches;
+    select(channels, rows) picks every row for every channel instead. Arithmetic, ufuncs and
+    ndarray methods or attributes such as .T, .mean() or .astype() read the whole view first,
+    as does np.asarray(view).
+    """
+
+    def __init__(self, handle, rows=slice(None), columns=None):
+        self.handle = handle
+        self._rows = range(len(handle))[rows]
+        self._columns = list(range(handle.shape[1])) if columns is None else list(columns)
+        self.dtype = handle.dtype
+        self.ndim = 2
+
+    @property
+    def shape(self):
+        return len(self._columns), len(self._rows)
+
+    @property
+    def size(self):
+        return self.shape[0] * self.shape[1]
+
+    def __len__(self):
+        return len(self._columns)
+
+    def __getitem__(self, key):
+        channels, rows = key if isinstance(key, tuple) else (key, slice(None))
+        if self._is_index_array(channels) and self._is_index_array(rows):
+            # Pairs, as in NumPy: read the rows once for the channels involved, then pick
+            channels, rows = np.broadcast_arrays(np.asarray(channels), np.asarray(rows))
+            used, inverse = np.unique(channels, return_inverse=True)
+            values = self.select(used, rows.ravel())
+            return values[inverse.ravel(), np.arange(rows.size)].reshape(rows.shape)
+        return self.select(channels, rows)
+
+    def select(self, channels, rows):
+        # Outer indexing: every selected row of every selected channel
+        if isinstance(channels, (int, np.integer)):
+            columns = self._columns[channels]
+        else:
+            columns = list(np.asarray(self._columns)[channels].ravel())
+        if isinstance(rows, (int, np.integer)):
+            return self.handle[self._rows[rows], columns]
+        if isinstance(rows, slice):
+            selected = self._rows[rows]
+            if selected.step < 0:
+                rows = np.arange(selected.start, selected.stop, selected.step)
+            else:
+                rows = slice(selected.start, selected.stop, selected.step)
+        else:
+            rows = np.asarray(self._rows)[np.asarray(rows)]
+        return self.handle[rows, columns].T
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.select(slice(None), slice(None)), dtype=dtype)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        inputs = [np.asarray(x) if isinstance(x, SignalView) else x for x in inputs]
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+    def __getattr__(self, name):
+        # Any other ndarray attribute or method (T, astype, mean, ...) on the loaded array
+        if name.startswith('_') or not hasattr(np.ndarray, name):
+            raise AttributeError(name)
+        return getattr(np.asarray(self), name)
+
+    @staticmethod
+    def _is_index_array(key):
+        return not isinstance(key, (slice, int, np.integer)) and np.asarray(key).dtype != bool
+
+    def __repr__(self):
+        return f"SignalView({self.handle.stream_name}, shape={self.shape}, dtype={self.dtype})"
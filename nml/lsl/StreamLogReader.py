@@ -1,66 +1,473 @@
+import os
 import struct
 import json
 import numpy as np
+from nml.lsl.LogFormat import (
+    HEADER_MAGIC, HEADER, FORMAT_DTYPES, BLOCK_MAGIC, BLOCK_HEADER,
+    INDEX_MAGIC, INDEX_DTYPE, FOOTER, CODECS, SESSION_SUFFIX, CORRECTION_DTYPE,
+    record_dtype, decode_block
+)
+from nml.lsl.StreamLogHandle import StreamLogHandle, resolve_channels
+from nml.lsl.StreamLogFollower import StreamLogFollower
+from nml.lsl.PolyphaseResampler import PolyphaseResampler
+
+
+SESSION_INDEX_DTYPE = np.dtype(INDEX_DTYPE.descr + [('segment', '<u4')])
 
 
 class StreamLogReader:
+    V1_SLAB_BYTES = 32 * 1024 * 1024
+
     def __init__(self, path):
+        # path is a single .bin log, or the .session.json manifest of a rotated recording
         self.path = path
+        self.manifest = None
+        if path.endswith(SESSION_SUFFIX):
+            with open(path, 'r') as f:
+                self.manifest = json.load(f)
+
+    def segment_paths(self):
+        if self.manifest is None:
+            return [self.path]
+        folder = os.path.dirname(self.path)
+        return [os.path.join(folder, seg["file"]) for seg in self.manifest["segments"]]
 
     def load(self):
-        with open(self.path, 'rb') as f:
-            magic = f.read(4)
-            if magic != b'LSLB':
-                raise ValueError("Invalid log format.")
-
-            version, nch, srate, fmt_code, name_len = struct.unpack('<IIfII', f.read(20))
-            name = f.read(name_len).decode('utf-8')
-
-            meta_len_bytes = f.read(4)
-            if not meta_len_bytes:
-                raise ValueError("Missing metadata length field after stream name.")
-            meta_len = struct.unpack('<I', meta_len_bytes)[0]
-            metadata_json = f.read(meta_len).decode('utf-8')
-            metadata = json.loads(metadata_json)
-
-            # Determine dtype
-            if fmt_code == 0:
-                dtype = np.float32
-            elif fmt_code == 1:
-                dtype = np.float64
-            else:
-                raise ValueError(f"Unsupported format code: {fmt_code}")
+        header, index = self._read_layout()
+        corrections = np.empty(0, dtype=CORRECTION_DTYPE)
+        max_error = 0.0
+        if header["version"] == 1:
+            with open(self.path, 'rb') as f:
+                f.seek(header["data_offset"])
+                timestamps, data = self._load_v1(f, header)
+        else:
+            timestamps, data, corrections, max_error = self._load_blocks(header, index)
+
+        metadata = header["metadata"]
+
+        # Provide fallback for legacy files
+        metadata_version = metadata.get("version", 1)
+        if metadata_version == 1 and "start_time" not in metadata:
+            metadata["start_time"] = timestamps[0]  # Estimate
 
-            # Read data body
-            timestamps = []
-            samples = []
-            sample_size = nch * dtype().nbytes
+        return {
+            "stream_name": header["stream_name"],
+            "sampling_rate": header["sampling_rate"],
+            "timestamps": timestamps,
+            "data": data,
+            "metadata": metadata,
+            "time_corrections": corrections,  # (local_time, offset) pairs, timebase logs
+            "timestamp_error": max_error      # max |reconstructed - original| timestamp
+        }
 
-            while True:
+    def read_header(self):
+        # Stream description without reading the body: the header, plus the footer/index or
+        # file size for the sample count (exact when an index or manifest gives it)
+        paths = self.segment_paths()
+        with open(paths[0], 'rb') as f:
+            header = self._read_header(f)
+            metadata = header["metadata"]
+            start_time = metadata.get("start_time")
+            if start_time is None and header["version"] == 1:
+                f.seek(header["data_offset"])
                 ts_bytes = f.read(8)
-                if not ts_bytes:
+                start_time = struct.unpack('<d', ts_bytes)[0] if len(ts_bytes) == 8 else None
+
+        n_samples, exact = 0, True
+        segments = self.manifest["segments"] if self.manifest else [{}]
+        for seg, seg_path in zip(segments, paths):
+            if seg.get("n_samples") is not None:
+                n_samples += seg["n_samples"]
+                continue
+            with open(seg_path, 'rb') as f:
+                n, seg_exact = self._count_samples(f, self._read_header(f))
+            if n is None:
+                n_samples, exact = None, False
+                break
+            n_samples += n
+            exact = exact and seg_exact
+
+        n_channels = header["n_channels"]
+        srate = header["sampling_rate"]
+        return {
+            "stream_name": header["stream_name"],
+            "sampling_rate": srate,
+            "format": header["dtype"].name,
+            "version": header["version"],
+            "codec": header["codec"],
+            "timebase": header["timebase"],
+            "n_channels": n_channels,
+            "channel_names": metadata.get("channel_names", [f"ch{i}" for i in range(n_channels)]),
+            "units": metadata.get("units", ["unknown"] * n_channels),
+            "start_time": start_time,
+            "n_samples": n_samples,
+            "n_samples_exact": exact,     # kept for callers; counts now come from indexes or block headers
+            "duration": n_samples / srate if n_samples is not None and srate > 0 else None,
+            "metadata": metadata,
+        }
+
+    def open(self):
+        # Lazy, memory-mapped handle; nothing but the header and block index is read here
+        header, index = self._read_layout()
+        return StreamLogHandle(self, header, index)
+
+    def follow(self, seconds=None):
+        # Tail a log that is still being written; see StreamLogFollower.poll(). With seconds,
+        # start from the last `seconds` already written instead of the beginning.
+        return StreamLogFollower(self, seconds)
+
+    def read_range(self, t0, t1, channels=None):
+        # Samples with t0 <= timestamp <= t1, for the selected channels only (index, label,
+        # regex or glob; see resolve_channels). The range is found by binary search over the
+        # timestamps, and only the blocks / byte span it covers are read.
+        with self.open() as handle:
+            rows = handle.time_slice(t0, t1)
+            return handle.timestamps_for(rows), handle[rows, handle.channel_indices(channels)]
+
+    def iter_chunks(self, n_samples=None, seconds=None, channels=None, overlap=0, t0=None, t1=None,
+                    decimate=None, target_rate=None):
+        # Yield (timestamps, data) windows of n_samples (or seconds) at a time, each starting
+        # `overlap` samples (seconds) before the previous one ended. Only one window is held
+        # in memory, so state such as lfilter's zi can be carried across a whole session.
+        # With decimate= or target_rate=, each window is resampled (PolyphaseResampler) with
+        # the filter state carried across windows, as if the whole range were resampled at once.
+        if decimate is None and target_rate is None:
+            yield from self._iter_windows(n_samples, seconds, channels, overlap, t0, t1)
+            return
+        if overlap:
+            raise ValueError("overlap cannot be combined with resampling.")
+        resampler = PolyphaseResampler.from_rates(self.read_header()["sampling_rate"], target_rate, decimate)
+        squeeze = False
+        for ts, x in self._iter_windows(n_samples, seconds, channels, 0, t0, t1):
+            squeeze = x.ndim == 1
+            t, y = resampler.push(ts, x)
+            if len(t):
+                yield t, y[:, 0] if squeeze else y
+        t, y = resampler.flush()
+        if len(t):
+            yield t, y[:, 0] if squeeze else y
+
+    def resample(self, target_rate=None, decimate=None, channels=None, t0=None, t1=None, n_samples=65536):
+        # -> (timestamps, data) at the reduced rate; full-rate data is only read n_samples at a time
+        chunks = list(self.iter_chunks(n_samples, channels=channels, t0=t0, t1=t1,
+                                       decimate=decimate, target_rate=target_rate))
+        if not chunks:
+            columns = resolve_channels(self.read_header()["channel_names"], channels)
+            return np.empty(0), np.empty((0,) if isinstance(columns, int) else (0, len(columns)))
+        return np.concatenate([c[0] for c in chunks]), np.concatenate([c[1] for c in chunks])
+
+    def _iter_windows(self, n_samples, seconds, channels, overlap, t0, t1):
+        with self.open() as handle:
+            if seconds is not None:
+                if handle.sampling_rate <= 0:
+                    raise ValueError("Chunks in seconds need a stream with a nominal sampling rate.")
+                n_samples = int(round(seconds * handle.sampling_rate))
+                overlap = int(round(overlap * handle.sampling_rate))
+            if not n_samples or n_samples <= 0:
+                raise ValueError("Give a positive n_samples or seconds.")
+            if not 0 <= overlap < n_samples:
+                raise ValueError(f"overlap must be in [0, {n_samples}) samples, got {overlap}")
+
+            columns = handle.channel_indices(channels)
+            rows = handle.time_slice(t0, t1)
+            start = rows.start
+            while start < rows.stop:
+                window = slice(start, min(start + n_samples, rows.stop))
+                yield handle.timestamps_for(window), handle[window, columns]
+                if window.stop == rows.stop:
                     break
-                if len(ts_bytes) < 8:
-                    raise EOFError("Unexpected end of file while reading timestamp.")
-                ts = struct.unpack('<d', ts_bytes)[0]
+                start = window.stop - overlap
 
-                sample_data = f.read(sample_size)
-                if len(sample_data) < sample_size:
-                    raise EOFError("Unexpected end of file while reading sample data.")
+    def iter_blocks(self, t0=None, t1=None):
+        # Yield (timestamps, data) one block at a time, decompressing each only when reached.
+        # Version 1 files have no blocks and come back as a single one.
+        header, index = self._read_layout()
+        if header["version"] == 1:
+            with open(self.path, 'rb') as f:
+                f.seek(header["data_offset"])
+                yield self._load_v1(f, header)
+            return
+        for block, f in self._open_blocks(self._blocks_between(index, t0, t1)):
+            records, _, _ = self._read_block(f, header, block)
+            yield records['ts'], records['x']
 
-                data = np.frombuffer(sample_data, dtype=dtype)
-                timestamps.append(ts)
-                samples.append(data)
+    # === Files still being written (see StreamLogFollower) ===
 
-        # Provide fallback for legacy files
-        metadata_version = metadata.get("version", 1)
-        if metadata_version == 1 and "start_time" not in metadata:
-            metadata["start_time"] = timestamps[0]  # Estimate
+    def reload_manifest(self):
+        # Re-read the manifest of a session being recorded; keeps the last one read if it is
+        # being replaced right now
+        if self.manifest is None:
+            return
+        try:
+            with open(self.path, 'r') as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def read_file_header(self, f):
+        # Header of one open log file (or segment), or None while it is not completely written
+        f.seek(0)
+        try:
+            return self._read_header(f)
+        except (ValueError, struct.error, UnicodeDecodeError):
+            return None
+
+    def tail_blocks(self, f, header, offset):
+        # Yield (end offset, timestamps, data) for each complete version 2 block from offset on.
+        # Stops, without raising, at the index footer, at preallocated space not yet written and
+        # at a block still being written, which a later call picks up from the same offset.
+        size = os.fstat(f.fileno()).st_size
+        while offset + BLOCK_HEADER.size <= size:
+            f.seek(offset)
+            magic, n, t_first, t_last, _, payload_len = BLOCK_HEADER.unpack(f.read(BLOCK_HEADER.size))
+            if magic != BLOCK_MAGIC or offset + BLOCK_HEADER.size + payload_len > size:
+                return
+            block = {"offset": offset, "n_samples": n, "payload_len": payload_len}
+            try:
+                records, _, _ = self._read_block(f, header, block)
+            except Exception:
+                return  # payload only partly on disk (e.g. inside preallocated space)
+            # Zeros where the last records should be also mean the block is not all there yet
+            if n and (records['ts'][0] != t_first or records['ts'][-1] != t_last):
+                return
+            offset += BLOCK_HEADER.size + payload_len
+            yield offset, records['ts'], records['x']
+
+    def tail_offset(self, f, header, seconds):
+        # Offset of the first record (version 1) or block (version 2) within `seconds` of the last
+        # one written, found by binary search over the mapped records or from the block headers alone
+        size = os.fstat(f.fileno()).st_size
+        if header["version"] == 1:
+            rec_dtype = header["record_dtype"]
+            n = (size - header["data_offset"]) // rec_dtype.itemsize
+            if n == 0:
+                return header["data_offset"]
+            ts = np.memmap(f, dtype=rec_dtype, mode='r', offset=header["data_offset"], shape=(n,))['ts']
+            return header["data_offset"] + int(np.searchsorted(ts, ts[-1] - seconds, side='left')) * rec_dtype.itemsize
+        footer = self._read_footer(f, header, size)
+        if footer is not None:
+            f.seek(footer[0])
+            index = np.frombuffer(f.read(footer[1] * INDEX_DTYPE.itemsize), dtype=INDEX_DTYPE)
+        else:
+            index, _ = self._walk_blocks(f, header, size)
+        if len(index) == 0:
+            return header["data_offset"]
+        return int(index['offset'][np.searchsorted(index['t_last'], index['t_last'][-1] - seconds, side='left')])
+
+    def footer_offset(self, f, header):
+        # Where the index footer starts once the logger has closed the file, else None
+        footer = self._read_footer(f, header, os.fstat(f.fileno()).st_size)
+        return footer[0] if footer is not None else None
+
+    def read_time_corrections(self):
+        # (local_time, offset) clock-offset samples stored by timebase logs, one block at a time;
+        # empty for logs written without timebase=True
+        header, index = self._read_layout()
+        if not header["timebase"]:
+            return np.empty(0, dtype=CORRECTION_DTYPE)
+        corrections = [np.empty(0, dtype=CORRECTION_DTYPE)]
+        for block, f in self._open_blocks(index):
+            _, block_corrections, _ = self._read_block(f, header, block)
+            corrections.append(block_corrections)
+        return np.concatenate(corrections)
+
+    def _blocks_between(self, index, t0=None, t1=None):
+        if t0 is not None:
+            index = index[np.searchsorted(index['t_last'], t0, side='left'):]
+        if t1 is not None:
+            index = index[:np.searchsorted(index['t_first'], t1, side='right')]
+        return index
+
+    def _read_layout(self):
+        # Header of the (first) file, plus for v2 one block index spanning every segment
+        paths = self.segment_paths()
+        header = None
+        indexes = []
+        for i, seg_path in enumerate(paths):
+            with open(seg_path, 'rb') as f:
+                seg_header = self._read_header(f)
+                if header is None:
+                    header = seg_header
+                    if header["version"] == 1:
+                        if len(paths) > 1:
+                            raise ValueError("Rotated sessions must use LSLB version 2.")
+                        return header, None
+                elif (seg_header["n_channels"], seg_header["fmt_code"], seg_header["codec"]) != \
+                        (header["n_channels"], header["fmt_code"], header["codec"]):
+                    raise ValueError(f"Segment {seg_path} does not match the rest of the session.")
+                seg_index = self._read_index(f, seg_header, seg_path)
+            session_index = np.empty(len(seg_index), dtype=SESSION_INDEX_DTYPE)
+            for field in INDEX_DTYPE.names:
+                session_index[field] = seg_index[field]
+            session_index['segment'] = i
+            indexes.append(session_index)
+        return header, np.concatenate(indexes)
+
+    def _open_blocks(self, index):
+        # Pair each block with an open handle on its segment, opening every file once
+        paths = self.segment_paths()
+        f, current = None, None
+        try:
+            for block in index:
+                segment = int(block['segment'])
+                if segment != current:
+                    if f is not None:
+                        f.close()
+                    f, current = open(paths[segment], 'rb'), segment
+                yield block, f
+        finally:
+            if f is not None:
+                f.close()
+
+    def _read_header(self, f):
+        magic = f.read(4)
+        if magic != HEADER_MAGIC:
+            raise ValueError("Invalid log format.")
+
+        version, nch, srate, fmt_code, name_len = struct.unpack('<IIfII', f.read(HEADER.size - 4))
+        name = f.read(name_len).decode('utf-8')
+
+        meta_len_bytes = f.read(4)
+        if not meta_len_bytes:
+            raise ValueError("Missing metadata length field after stream name.")
+        meta_len = struct.unpack('<I', meta_len_bytes)[0]
+        metadata_json = f.read(meta_len).decode('utf-8')
+        metadata = json.loads(metadata_json)
+
+        # Determine dtype
+        if fmt_code not in FORMAT_DTYPES:
+            raise ValueError(f"Unsupported format code: {fmt_code}")
+        dtype = FORMAT_DTYPES[fmt_code]
+
+        codec = metadata.get("codec")
+        if codec is not None and codec not in CODECS:
+            raise ValueError(f"Unsupported codec: {codec}")
 
         return {
-            "stream_name": name,
+            "version": version,
+            "n_channels": nch,
             "sampling_rate": srate,
-            "timestamps": np.array(timestamps),
-            "data": np.stack(samples),
-            "metadata": metadata
+            "fmt_code": fmt_code,
+            "dtype": dtype,
+            "record_dtype": record_dtype(dtype, nch),
+            "codec": codec,
+            "timebase": metadata.get("timebase") is not None,
+            "stream_name": name,
+            "metadata": metadata,
+            "data_offset": f.tell(),
         }
+
+    def _load_v1(self, f, header):
+        # Parse the whole body in one read using the packed record dtype
+        rec_dtype = header["record_dtype"]
+        start = f.tell()
+        f.seek(0, os.SEEK_END)
+        body = f.tell() - start
+        f.seek(start)
+
+        n, tail = divmod(body, rec_dtype.itemsize)
+        if tail:
+            if tail < 8:
+                raise EOFError("Unexpected end of file while reading timestamp.")
+            raise EOFError("Unexpected end of file while reading sample data.")
+
+        # Read in slabs and split into contiguous ts/x arrays, so peak memory stays near 1x the body
+        timestamps = np.empty(n, dtype='<f8')
+        data = np.empty((n, header["n_channels"]), dtype=header["dtype"])
+        slab = np.empty(max(1, self.V1_SLAB_BYTES // rec_dtype.itemsize), dtype=rec_dtype)
+        for start in range(0, n, len(slab)):
+            records = slab[:min(len(slab), n - start)]
+            if f.readinto(records.view(np.uint8)) != records.nbytes:
+                raise EOFError("Unexpected end of file while reading sample data.")
+            timestamps[start:start + len(records)] = records['ts']
+            data[start:start + len(records)] = records['x']
+        return timestamps, data
+
+    def _read_index(self, f, header, path):
+        # Version 2: the block index sits in front of a fixed-size footer at EOF
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        footer = self._read_footer(f, header, size)
+        if footer is not None:
+            index_offset, n_blocks = footer
+            f.seek(index_offset)
+            return np.frombuffer(f.read(n_blocks * INDEX_DTYPE.itemsize), dtype=INDEX_DTYPE)
+
+        # No footer (logger did not close cleanly): recover the index by walking block headers
+        return self._scan_blocks(f, header, size, path)
+
+    def _read_footer(self, f, header, size):
+        if size - header["data_offset"] < FOOTER.size:
+            return None
+        f.seek(size - FOOTER.size)
+        index_offset, n_blocks, magic = FOOTER.unpack(f.read(FOOTER.size))
+        if magic != INDEX_MAGIC or index_offset + n_blocks * INDEX_DTYPE.itemsize + FOOTER.size != size:
+            return None
+        return index_offset, n_blocks
+
+    def _count_samples(self, f, header):
+        # -> (n_samples, exact) for one file from its size, footer or block headers
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        body = size - header["data_offset"]
+        if header["version"] == 1:
+            return body // header["record_dtype"].itemsize, True
+        footer = self._read_footer(f, header, size)
+        if footer is not None:
+            index_offset, n_blocks = footer
+            f.seek(index_offset)
+            index = np.frombuffer(f.read(n_blocks * INDEX_DTYPE.itemsize), dtype=INDEX_DTYPE)
+            return int(index['n_samples'].sum()), True
+        # No footer (still being written, or not closed cleanly): count the complete blocks. The file
+        # size alone would also count block headers and space preallocated for the segment.
+        index, _ = self._walk_blocks(f, header, size)
+        return int(index['n_samples'].sum()), True
+
+    def _scan_blocks(self, f, header, size, path):
+        index, offset = self._walk_blocks(f, header, size)
+        if offset != size:
+            print(f"[WARNING] {path} was not closed cleanly; recovered {len(index)} complete block(s).")
+        return index
+
+    def _walk_blocks(self, f, header, size):
+        # -> (index of the blocks found by following block headers, offset where they end)
+        entries = []
+        offset = header["data_offset"]
+        while offset + BLOCK_HEADER.size <= size:
+            f.seek(offset)
+            magic, n, t_first, t_last, _, payload_len = BLOCK_HEADER.unpack(f.read(BLOCK_HEADER.size))
+            if magic != BLOCK_MAGIC or offset + BLOCK_HEADER.size + payload_len > size:
+                break  # end of written data, or a block cut off mid-write
+            entries.append((offset, n, payload_len, t_first, t_last))
+            offset += BLOCK_HEADER.size + payload_len
+        return np.array(entries, dtype=INDEX_DTYPE), offset
+
+    def _read_block(self, f, header, block):
+        # -> (records, time corrections, max timestamp error) for one block
+        n = int(block['n_samples'])
+        f.seek(int(block['offset']) + BLOCK_HEADER.size)
+        if header["codec"] is None and not header["timebase"]:
+            records = np.empty(n, dtype=header["record_dtype"])
+            f.readinto(records.view(np.uint8))
+            return records, np.empty(0, dtype=CORRECTION_DTYPE), 0.0
+        payload = f.read(int(block['payload_len']))
+        return decode_block(payload, header["codec"], header["record_dtype"], n, header["timebase"])
+
+    def _load_blocks(self, header, index):
+        # Read every block's records straight into one preallocated array
+        records = np.empty(int(index['n_samples'].sum()), dtype=header["record_dtype"])
+        corrections = [np.empty(0, dtype=CORRECTION_DTYPE)]
+        max_error = 0.0
+        start = 0
+        for block, f in self._open_blocks(index):
+            n = int(block['n_samples'])
+            if header["codec"] is None and not header["timebase"]:
+                f.seek(int(block['offset']) + BLOCK_HEADER.size)
+                f.readinto(records[start:start + n].view(np.uint8))
+            else:
+                records[start:start + n], block_corrections, block_error = self._read_block(f, header, block)
+                corrections.append(block_corrections)
+                max_error = max(max_error, block_error)
+            start += n
+        return (np.ascontiguousarray(records['ts']), np.ascontiguousarray(records['x']),
+                np.concatenate(corrections), max_error)
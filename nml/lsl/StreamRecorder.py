@@ -0,0 +1,172 @@
+import threading
+import numpy as np
+from nml.lsl.BinaryStreamLogger import BinaryStreamLogger
+from nml.lsl.ChunkBuffer import pull_chunk_into
+
+
+class ChunkRing:
+    """Bounded single-producer/single-consumer ring of preallocated chunks."""
+
+    def __init__(self, n_slots, max_samples, n_channels, dtype):
+        self.n_slots = n_slots
+        self.max_samples = max_samples
+        self.data = np.empty((n_slots, max_samples, n_channels), dtype=dtype)
+        self.timestamps = np.empty((n_slots, max_samples), dtype=np.float64)
+        self.counts = np.zeros(n_slots, dtype=np.int64)
+
+        self._head = 0   # oldest filled slot
+        self._depth = 0  # number of filled slots
+        self._cond = threading.Condition()
+
+        self.high_water = 0
+        self.overflows = 0   # times the ring filled up (once per episode, not per wait)
+        self._full = False
+
+    @property
+    def depth(self):
+        return self._depth
+
+    def acquire(self, timeout=None):
+        # Producer side: index of the next free slot, or None if the ring stayed full.
+        # A full ring is counted as one overflow until a slot is freed; the producer then waits,
+        # leaving the samples in the inlet's own LSL buffer rather than dropping them.
+        with self._cond:
+            if self._depth == self.n_slots:
+                if not self._full:
+                    self._full = True
+                    self.overflows += 1
+                if not self._cond.wait_for(lambda: self._depth < self.n_slots, timeout):
+                    return None
+            return (self._head + self._depth) % self.n_slots
+
+    def commit(self, n_samples):
+        with self._cond:
+            slot = (self._head + self._depth) % self.n_slots
+            self.counts[slot] = n_samples
+            self._depth += 1
+            self.high_water = max(self.high_water, self._depth)
+            self._cond.notify_all()
+
+    def get(self, timeout=None):
+        # Consumer side: index of the oldest filled slot, or None on timeout.
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._depth > 0, timeout):
+                return None
+            return self._head
+
+    def release(self):
+        with self._cond:
+            self._head = (self._head + 1) % self.n_slots
+            self._depth -= 1
+            self._full = False
+            self._cond.notify_all()
+
+
+def recorder_status(recorders):
+    # Status line for the logging GUIs from StreamRecorder / ProcessRecorder stats
+    stats = [r.stats() for r in recorders]
+    depth = max((s["queue_depth"] for s in stats), default=0)
+    high_water = max((s["high_water"] for s in stats), default=0)
+    overflows = sum(s["overflows"] for s in stats)
+    errors = [f'{s["stream_name"]}: {s["error"]}' for s in stats if s["error"]]
+    stopped = [s["stream_name"] for s in stats if s.get("alive") is False and not s["error"]]
+    errors += [f"{name}: recorder process exited" for name in stopped]
+    text = (f"Logging {len(stats)} stream(s)...\n"
+            f"Queue depth {depth} (max {high_water}), overflows {overflows}")
+    if errors:
+        text += "\n" + "\n".join(errors)
+    return text
+
+
+class StreamRecorder:
+    """Runs a BinaryStreamLogger off the GUI thread.
+
+    One acquisition thread pulls from the inlet into a ChunkRing and one writer
+    thread drains the ring to disk, so slow disks or UI stalls do not block pulls.
+    """
+
+    def __init__(self, logger: BinaryStreamLogger, n_slots=64, max_samples=1024, pull_timeout=0.1):
+        self.logger = logger
+        self.inlet = logger.inlet
+        self.pull_timeout = pull_timeout
+        self.ring = ChunkRing(n_slots, max_samples, logger.n_channels, logger.sample_dtype)
+
+        self.samples_written = 0
+        self.chunks_written = 0
+        self.error = None
+
+        self._running = False
+        self._acquiring = False
+        self._acq_thread = None
+        self._writer_thread = None
+
+    def start(self):
+        # The first chunk was already pulled while writing the header
+        if hasattr(self.logger, 'pending_chunk'):
+            self.logger.log_chunk()
+
+        self._running = True
+        self._acquiring = True
+        self._acq_thread = threading.Thread(target=self._acquire_loop, daemon=True)
+        self._writer_thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer_thread.start()
+        self._acq_thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._acq_thread is not None:
+            self._acq_thread.join()
+        if self._writer_thread is not None:
+            self._writer_thread.join()
+        self.logger.close()
+
+    @property
+    def running(self):
+        return self._running
+
+    def stats(self):
+        return {
+            "stream_name": self.logger.stream_name,
+            "queue_depth": self.ring.depth,
+            "queue_capacity": self.ring.n_slots,
+            "high_water": self.ring.high_water,
+            "overflows": self.ring.overflows,
+            "samples_written": self.samples_written,
+            "chunks_written": self.chunks_written,
+            "error": None if self.error is None else str(self.error),
+        }
+
+    def _acquire_loop(self):
+        ring = self.ring
+        try:
+            while self._running:
+                slot = ring.acquire(timeout=self.pull_timeout)
+                if slot is None:
+                    continue
+                n = pull_chunk_into(self.inlet, ring.data[slot], ring.timestamps[slot],
+                                    timeout=self.pull_timeout)
+                if n:
+                    ring.commit(n)
+        except Exception as e:
+            self.error = e
+            print(f"[ERROR] Acquisition stopped for {self.logger.stream_name}: {e}")
+        finally:
+            self._acquiring = False
+
+    def _write_loop(self):
+        ring = self.ring
+        while self._acquiring or ring.depth > 0:
+            slot = ring.get(timeout=0.1)
+            if slot is None:
+                continue
+            n = int(ring.counts[slot])
+            try:
+                self.logger.write_chunk(ring.data[slot, :n], ring.timestamps[slot, :n])
+            except Exception as e:
+                self.error = e
+                self._running = False
+                print(f"[ERROR] Writing stopped for {self.logger.stream_name}: {e}")
+                break
+            ring.release()
+            self.samples_written += n
+            self.chunks_written += 1
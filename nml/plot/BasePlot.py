@@ -1,5 +1,6 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton
 import pyqtgraph as pg
+from nml.lsl.ChunkBuffer import ChunkBuffer
 
 class BasePlot(QWidget):
     preferred_height: int = 300
@@ -9,6 +10,7 @@ class BasePlot(QWidget):
         super().__init__(parent)
         self.logger = logger
         self.inlet = logger.inlet
+        self.chunk_buffer = ChunkBuffer(self.inlet)
         self.cfg_handler = cfg_handler
         self.on_close = on_close
         self.buffer = buffer
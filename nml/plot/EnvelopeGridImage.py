@@ -112,13 +112,13 @@ class EnvelopeGridImage(BasePlot):
         return plot
 
     def timerEvent(self, event):
-        chunk, timestamps = self.inlet.pull_chunk(timeout=0.0)
-        if not timestamps:
+        chunk, timestamps = self.chunk_buffer.pull(timeout=0.0)
+        if len(timestamps) == 0:
             return
-        data = np.array(chunk).T  
+        data = chunk.T  # [channels x samples] view of the pull buffer
 
         # Apply HPF with state
-        hpf = np.zeros_like(data)
+        hpf = np.zeros(data.shape)
         for i in range(64):
             hpf[i], self.hp_zi[i] = lfilter(self.hp_b, self.hp_a, data[i], zi=self.hp_zi[i])
 
@@ -130,14 +130,14 @@ class TimeSeriesArray(BasePlot):
         editor.show()
 
     def timerEvent(self, event):
-        chunk, timestamps = self.inlet.pull_chunk(timeout=0.0)
-        if not timestamps:
+        chunk, timestamps = self.chunk_buffer.pull(timeout=0.0)
+        n = min(len(timestamps), self.buffer.shape[1])
+        if n == 0:
             return
 
-        new_data = np.array(chunk).T  # [channels x samples]
-        n = new_data.shape[1]
-        self.buffer = np.roll(self.buffer, -n, axis=1)
-        self.buffer[:, -n:] = new_data[:64, :]
+        # Shift in place and copy the newest samples in: [channels x samples]
+        self.buffer[:, :-n] = self.buffer[:, n:]
+        self.buffer[:, -n:] = chunk[-n:, :self.n_channels].T
         self.update_plot()
 
     def update_plot(self):
@@ -55,9 +55,8 @@ class TimeSeriesPlot(BasePlot):
 
 
     def timerEvent(self, event):
-        chunk, timestamps = self.logger.inlet.pull_chunk(timeout=0.0)
-        if timestamps:
-            new_data = [sample[self.current_channel] for sample in chunk]
-            self.data.extend(new_data)
+        chunk, timestamps = self.chunk_buffer.pull(timeout=0.0)
+        if len(timestamps):
+            self.data.extend(chunk[:, self.current_channel])
             self.data = self.data[-1000:]
             self.curve.setData(self.data)